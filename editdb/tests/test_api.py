@@ -0,0 +1,439 @@
+import importlib.machinery
+import importlib.util
+import io
+import json
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / "editdb"
+
+
+def load_module(monkeypatch, runtime_home: Path):
+    monkeypatch.setenv("EDITDB_HOME", str(runtime_home))
+    module_name = f"editdb_api_{uuid.uuid4().hex}"
+    loader = importlib.machinery.SourceFileLoader(module_name, str(SCRIPT_PATH))
+    spec = importlib.util.spec_from_loader(module_name, loader)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture()
+def editdb(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    db_path = tmp_path / "data.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"n{i}",) for i in range(250)])
+    conn.execute("CREATE TABLE pairs (a TEXT, b INTEGER, v TEXT, PRIMARY KEY (a, b)) WITHOUT ROWID")
+    conn.executemany("INSERT INTO pairs VALUES (?, ?, ?)", [(f"k{i % 3}", i, "x") for i in range(20)])
+    conn.commit()
+    conn.close()
+    module.db_manager = module.DBManager(str(db_path))
+    return module
+
+
+@pytest.fixture()
+def client(editdb):
+    from starlette.testclient import TestClient
+    return TestClient(editdb.app)
+
+
+def fetch_all_pages(client, table, limit):
+    rows, after = [], None
+    while True:
+        params = {"limit": limit}
+        if after:
+            params["after"] = after
+        page = client.get(f"/api/table/{table}/full", params=params).json()
+        rows.extend(page["data"])
+        after = page["nextCursor"]
+        if after is None:
+            return rows
+
+
+def test_keyset_pages_cover_table_in_key_order(client):
+    rows = fetch_all_pages(client, "items", 100)
+    assert [r["id"] for r in rows] == list(range(1, 251))
+    assert set(rows[0]) == {"id", "name"}
+
+
+def test_without_rowid_table_pages_on_primary_key(client):
+    rows = fetch_all_pages(client, "pairs", 7)
+    keys = [(r["a"], r["b"]) for r in rows]
+    assert keys == sorted(keys) and len(keys) == 20
+
+
+def test_invalid_cursor_returns_400(client):
+    assert client.get("/api/table/items/full", params={"after": "nope"}).status_code == 400
+
+
+def test_missing_table_returns_404(client):
+    assert client.get("/api/table/missing/full").status_code == 404
+
+
+def test_row_count_follows_grid_edits(client):
+    assert client.get("/api/table/items/full").json()["totalRows"] == 250
+    client.post("/api/data/items", json={"data": {"name": "new"}})
+    client.post("/api/data/items/delete", json={"id": 1})
+    client.post("/api/data/items/delete", json={"id": 2})
+    page = client.get("/api/table/items/full").json()
+    assert page["totalRows"] == 249 and page["approximate"] is False
+
+
+def test_console_write_marks_count_approximate_until_recounted(client):
+    client.get("/api/table/items/full")
+    time.sleep(0.01)  # let the file mtime move on coarse clocks
+    client.post("/api/query", json={"query": "DELETE FROM items WHERE id <= 50"})
+    page = client.get("/api/table/items/full").json()
+    assert page["approximate"] is True and page["totalRows"] == 250
+    for _ in range(200):
+        page = client.get("/api/table/items/full").json()
+        if not page["approximate"]:
+            break
+        time.sleep(0.01)
+    assert page["totalRows"] == 200 and page["approximate"] is False
+
+
+def test_json_export_is_an_array_of_rows(client, editdb, monkeypatch):
+    monkeypatch.setattr(editdb, "EXPORT_BATCH_SIZE", 7)
+    resp = client.get("/api/export/items/json")
+    assert resp.json() == [{"id": i, "name": f"n{i - 1}"} for i in range(1, 251)]
+
+
+def test_csv_and_ndjson_exports_stream_every_row(client, editdb, monkeypatch):
+    monkeypatch.setattr(editdb, "EXPORT_BATCH_SIZE", 7)
+    lines = client.get("/api/export/items/csv").text.splitlines()
+    assert lines[0] == "id,name" and lines[1] == "1,n0" and len(lines) == 251
+    records = [json.loads(line) for line in client.get("/api/export/items/ndjson").text.splitlines()]
+    assert records[-1] == {"id": 250, "name": "n249"} and len(records) == 250
+
+
+def test_parquet_export(client, editdb, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(editdb, "EXPORT_BATCH_SIZE", 100)
+    table = pq.read_table(io.BytesIO(client.get("/api/export/items/parquet").content))
+    assert table.num_rows == 250 and table.column("name")[249].as_py() == "n249"
+
+
+def test_parquet_schema_follows_declared_types(client, editdb, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(editdb, "EXPORT_BATCH_SIZE", 5)
+    with editdb.db_manager.writer() as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, note TEXT, n INTEGER, loose)")
+        conn.executemany("INSERT INTO t (note, n, loose) VALUES (NULL, ?, ?)", [(i, i) for i in range(10)])
+        conn.execute("INSERT INTO t (note, n, loose) VALUES ('x', 'not a number', 'x')")
+        conn.execute("INSERT INTO t (note, n, loose) VALUES (x'cafe', 2.0, 1.5)")
+    table = pq.read_table(io.BytesIO(client.get("/api/export/t/parquet").content))
+    assert [str(f.type) for f in table.schema] == ["int64", "string", "int64", "string"]
+    assert table.num_rows == 12
+    assert table.column("note").to_pylist()[9:] == [None, "x", "cafe"]
+    assert table.column("n").to_pylist()[9:] == [9, None, 2]
+    assert table.column("loose").to_pylist()[9:] == ["9", "x", "1.5"]
+
+
+def test_csv_import_reports_progress_per_batch(client):
+    body = "name\n" + "".join(f"m{i}\n" for i in range(25))
+    resp = client.post("/api/import/items", params={"batch_size": 10},
+                       files={"file": ("rows.csv", body, "text/csv")})
+    messages = [json.loads(line) for line in resp.text.splitlines()]
+    assert messages == [{"rows_imported": 10}, {"rows_imported": 20},
+                        {"status": "success", "rows_imported": 25}]
+    assert client.get("/api/table/items/full").json()["totalRows"] == 275
+
+
+def test_failed_import_rolls_back_every_batch(client):
+    body = "id,name\n" + "".join(f"{1000 + i},x\n" for i in range(30)) + "1,duplicate\n"
+    resp = client.post("/api/import/items", params={"batch_size": 10},
+                       files={"file": ("rows.csv", body, "text/csv")})
+    assert json.loads(resp.text.splitlines()[-1])["status"] == "error"
+    assert client.get("/api/count/items").json()["count"] == 250
+
+
+def test_ndjson_import(client):
+    body = '{"a": "k9", "b": 1, "v": "y"}\n{"a": "k9", "b": 2}\n'
+    resp = client.post("/api/import/pairs", files={"file": ("rows.ndjson", body, "application/x-ndjson")})
+    assert json.loads(resp.text.splitlines()[-1]) == {"status": "success", "rows_imported": 2}
+    rows = client.get("/api/table/pairs/full", params={"limit": 1000}).json()["data"]
+    assert {"a": "k9", "b": 2, "v": None} in rows
+
+
+def test_database_runs_in_wal_mode(editdb):
+    with editdb.db_manager.reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_console_reads_run_while_writer_is_held(client, editdb):
+    with editdb.db_manager.writer() as conn:
+        conn.execute("INSERT INTO items (name) VALUES ('pending')")
+        resp = client.post("/api/query", json={"query": "SELECT COUNT(*) AS n FROM items"})
+        assert resp.json()["rows"] == [{"n": 250}]
+
+
+def test_console_writes_fall_back_to_writer(client):
+    resp = client.post("/api/query", json={"query": "UPDATE items SET name = 'z' WHERE id = 1"})
+    assert resp.status_code == 200
+    rows = client.post("/api/query", json={"query": "SELECT name FROM items WHERE id = 1"}).json()["rows"]
+    assert rows == [{"name": "z"}]
+
+
+def test_stats_report_latency_per_endpoint(client):
+    for _ in range(3):
+        client.get("/api/table/items/full")
+    client.get("/api/table/missing/full")
+    stats = client.get("/api/stats").json()
+    grid = stats["endpoints"]["GET /api/table/{table_name}/full"]
+    assert grid["count"] == 4 and grid["errors"] == 1
+    assert grid["p50_ms"] <= grid["p95_ms"] <= grid["max_ms"]
+    assert 1 <= stats["pool"]["readers_open"] <= stats["pool"]["read_pool_size"]
+
+
+def wait_for_job(client, job_id):
+    for _ in range(500):
+        job = client.get(f"/api/query/jobs/{job_id}").json()
+        if job["status"] != "running":
+            return job
+        time.sleep(0.01)
+    raise AssertionError("query job did not finish")
+
+
+def test_query_job_pages_spilled_results(client, editdb, monkeypatch):
+    monkeypatch.setattr(editdb, "QUERY_JOB_BATCH_SIZE", 40)
+    job = client.post("/api/query/jobs", json={"query": "SELECT * FROM items ORDER BY name"}).json()
+    job = wait_for_job(client, job["id"])
+    assert job["status"] == "done" and job["row_count"] == 250
+    assert job["plan"] == ["SCAN items", "USE TEMP B-TREE FOR ORDER BY"]
+    assert job["elapsed_ms"] >= 0
+    page = client.get(f"/api/query/jobs/{job['id']}/rows", params={"offset": 240, "limit": 50}).json()
+    assert [r["name"] for r in page["rows"]] == sorted(f"n{i}" for i in range(250))[240:]
+
+
+def test_query_job_can_be_cancelled(client):
+    endless = "WITH RECURSIVE r(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM r) SELECT count(*) FROM r"
+    job = client.post("/api/query/jobs", json={"query": endless}).json()
+    time.sleep(0.05)
+    assert client.post(f"/api/query/jobs/{job['id']}/cancel").status_code == 200
+    assert wait_for_job(client, job["id"])["status"] == "cancelled"
+
+
+def test_query_job_writes_go_through_writer(client):
+    job = client.post("/api/query/jobs", json={"query": "DELETE FROM items WHERE id > 200"}).json()
+    job = wait_for_job(client, job["id"])
+    assert job["status"] == "done" and job["rows_affected"] == 50
+    assert client.get("/api/count/items").json()["count"] == 200
+
+
+def test_console_pragmas_do_not_leak_into_pooled_connections(client, editdb):
+    for pragma in ("PRAGMA query_only = 0", "PRAGMA foreign_keys = 0"):
+        assert client.post("/api/query", json={"query": pragma}).status_code == 200
+    with editdb.db_manager.reader() as conn:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("INSERT INTO items (name) VALUES ('sneaky')")
+        # A borrower that changes settings anyway hands back a reset connection
+        conn.execute("PRAGMA query_only = 0")
+    with editdb.db_manager.reader() as again:
+        assert again is conn and again.execute("PRAGMA query_only").fetchone()[0] == 1
+    with editdb.db_manager.writer() as conn:
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 0
+
+
+def test_deleted_query_job_removes_spill_file(client, editdb):
+    job = client.post("/api/query/jobs", json={"query": "SELECT 1"}).json()
+    wait_for_job(client, job["id"])
+    spill_path = Path(editdb.query_jobs[job["id"]].spill_path)
+    assert spill_path.exists()
+    client.delete(f"/api/query/jobs/{job['id']}")
+    assert client.get(f"/api/query/jobs/{job['id']}").status_code == 404
+    assert job["id"] not in [j["id"] for j in client.get("/api/query/jobs").json()]
+    assert not spill_path.exists()
+
+
+def wait_for_migration(client, migration_id):
+    for _ in range(500):
+        status = client.get(f"/api/migrations/{migration_id}").json()
+        if not status["running"]:
+            return status
+        time.sleep(0.01)
+    raise AssertionError("migration did not finish")
+
+
+ITEMS_MIGRATION = {"columns": [
+    {"old_name": "id", "new_name": "id", "type": "INTEGER"},
+    {"old_name": "name", "new_name": "label", "type": "TEXT"},
+    {"old_name": "", "new_name": "extra", "type": "TEXT"},
+]}
+
+
+def test_online_migration_copies_in_chunks_and_restores_indexes(client, editdb, monkeypatch):
+    monkeypatch.setattr(editdb, "MIGRATION_CHUNK_SIZE", 40)
+    client.post("/api/indexes", json={"name": "items_name", "table": "items", "columns": ["name"]})
+    client.post("/api/indexes", json={"name": "items_id", "table": "items", "columns": ["id"]})
+    resp = client.post("/api/migrate/items", json=ITEMS_MIGRATION).json()
+    status = wait_for_migration(client, resp["migration"]["id"])
+    assert status["state"] == "done" and status["rows_copied"] == 250
+    assert status["indexes_total"] == 2 and status["skipped"] == ["items_name"]  # name was renamed
+    assert [i["name"] for i in client.get("/api/indexes").json()] == ["items_id"]
+    rows = fetch_all_pages(client, "items", 100)
+    assert rows[0] == {"id": 1, "label": "n0", "extra": None} and len(rows) == 250
+    assert editdb.MIGRATION_JOURNAL not in client.get("/api/tables").json()
+
+
+def test_migration_progress_is_streamed_as_server_sent_events(client, editdb):
+    migration = editdb.db_manager.start_migration("items", ['"id" INTEGER', '"name" TEXT'], {"id": "id", "name": "name"})
+    editdb.db_manager.run_migration(migration)
+    with client.stream("GET", f"/api/migrations/{migration.id}/events") as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [json.loads(line[len("data: "):]) for line in resp.iter_lines() if line.startswith("data: ")]
+    assert events[-1]["state"] == "done" and not events[-1]["running"]
+
+
+def test_writes_during_migration_are_mirrored(editdb, monkeypatch):
+    monkeypatch.setattr(editdb, "MIGRATION_CHUNK_SIZE", 100)
+    db = editdb.db_manager
+    migration = db.start_migration("items", ['"id" INTEGER', '"name" TEXT'], {"id": "id", "name": "name"})
+    with db.writer() as conn:
+        migration._copy_chunk(conn, db.journal_entry(conn, migration.id))
+        conn.execute("UPDATE items SET name = 'changed' WHERE id = 5")   # already copied
+        conn.execute("DELETE FROM items WHERE id IN (6, 200)")           # copied / not yet copied
+        conn.execute("INSERT INTO items (name) VALUES ('late')")         # past the copy range
+    migration.run()
+    with db.reader() as conn:
+        rows = dict(conn.execute("SELECT id, name FROM items").fetchall())
+    assert rows[5] == "changed" and 6 not in rows and 200 not in rows
+    assert rows[251] == "late" and len(rows) == 249
+
+
+def test_rows_rejected_by_a_tightened_schema_fail_the_migration(client, editdb):
+    db = editdb.db_manager
+    with db.writer() as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)",
+                         [(1, "a", "a@x"), (2, None, "b@x"), (3, "c", "dup@x"), (4, "d", "dup@x")])
+    columns = ['"id" INTEGER', '"name" TEXT NOT NULL', '"email" TEXT UNIQUE']
+    mapping = {"id": "id", "name": "name", "email": "email"}
+    migration = db.start_migration("t", columns, mapping)
+    migration.run()
+    status = client.get(f"/api/migrations/{migration.id}").json()
+    assert status["state"] == "failed" and "NOT NULL" in status["error"]
+    assert client.get("/api/count/t").json()["count"] == 4
+    assert [c["name"] for c in client.get("/api/schema/t").json()] == ["id", "name", "email"]
+
+    # A mirrored write the new schema rejects is kept out of the shadow
+    # without displacing another row, and the swap refuses to go ahead.
+    with db.writer() as conn:
+        conn.execute("UPDATE t SET name = 'b' WHERE id = 2")
+        conn.execute("UPDATE t SET email = 'd@x' WHERE id = 4")
+    migration = db.start_migration("t", columns, mapping)
+    with db.writer() as conn:
+        migration._copy_chunk(conn, db.journal_entry(conn, migration.id))
+        conn.execute("UPDATE t SET email = 'a@x' WHERE id = 3")
+        assert conn.execute(f"SELECT COUNT(*) FROM {migration_shadow(db, migration)}").fetchone()[0] == 3
+    migration.run()
+    status = client.get(f"/api/migrations/{migration.id}").json()
+    assert status["state"] == "failed" and "3 of 4 rows" in status["error"]
+    with db.reader() as conn:
+        assert [r[0] for r in conn.execute("SELECT email FROM t ORDER BY id")] == ["a@x", "b@x", "a@x", "d@x"]
+
+
+def migration_shadow(db, migration):
+    with db.reader() as conn:
+        return '"' + db.journal_entry(conn, migration.id)["shadow_name"] + '"'
+
+
+def test_interrupted_migration_resumes_from_journal(client, editdb, monkeypatch):
+    monkeypatch.setattr(editdb, "MIGRATION_CHUNK_SIZE", 100)
+    db = editdb.db_manager
+    migration = db.start_migration("items", ['"id" INTEGER', '"name" TEXT'], {"id": "id", "name": "name"})
+    with db.writer() as conn:
+        migration._copy_chunk(conn, db.journal_entry(conn, migration.id))
+    # A fresh manager stands in for the server restarting after a crash.
+    editdb.db_manager = editdb.DBManager(db.db_path)
+    status = client.get(f"/api/migrations/{migration.id}").json()
+    assert status["interrupted"] and status["rows_copied"] == 100
+    assert client.post("/api/migrate/items", json=ITEMS_MIGRATION).status_code == 409
+    client.post(f"/api/migrations/{migration.id}/resume")
+    status = wait_for_migration(client, migration.id)
+    assert status["state"] == "done" and status["rows_copied"] == 250
+    assert client.get("/api/count/items").json()["count"] == 250
+
+
+def test_cancelled_migration_leaves_table_untouched(client, editdb):
+    db = editdb.db_manager
+    migration = db.start_migration("items", ['"id" INTEGER'], {"id": "id"})
+    assert client.post(f"/api/migrations/{migration.id}/cancel").json()["status"] == "success"
+    assert client.get(f"/api/migrations/{migration.id}").json()["state"] == "cancelled"
+    assert [c["name"] for c in client.get("/api/schema/items").json()] == ["id", "name"]
+    with db.reader() as conn:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert names == {"items", "pairs", editdb.MIGRATION_JOURNAL}
+
+
+def test_without_rowid_table_migrates_in_one_step(client):
+    resp = client.post("/api/migrate/pairs", json={"columns": [
+        {"old_name": "a", "new_name": "a", "type": "TEXT"},
+        {"old_name": "b", "new_name": "b", "type": "INTEGER"},
+    ]}).json()
+    status = wait_for_migration(client, resp["migration"]["id"])
+    assert status["state"] == "done" and status["rows_copied"] == 20
+
+
+def run_advisor(client):
+    assert client.post("/api/advisor/run").status_code == 200
+    for _ in range(500):
+        report = client.get("/api/advisor").json()
+        if report["status"] != "running":
+            return report
+        time.sleep(0.01)
+    raise AssertionError("index advisor did not finish")
+
+
+@pytest.fixture()
+def events(editdb):
+    with editdb.db_manager.writer() as conn:
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, at INTEGER)")
+        conn.executemany("INSERT INTO events (kind, at) VALUES (?, ?)",
+                         [(f"k{i % 500}", i) for i in range(20000)])
+        conn.execute("CREATE INDEX events_at ON events (at)")
+
+
+def test_workload_captures_reads_from_console_and_grid(client):
+    client.post("/api/query", json={"query": "SELECT * FROM items WHERE name = 'n1'"})
+    client.post("/api/query", json={"query": "SELECT  *  FROM items WHERE name = 'n1'"})
+    client.post("/api/query", json={"query": "UPDATE items SET name = 'x' WHERE id = 1"})
+    client.get("/api/table/items/full")
+    workload = client.get("/api/advisor/workload").json()
+    assert [(w["source"], w["count"]) for w in workload] == [("grid", 1), ("console", 2)]
+    client.delete("/api/advisor/workload")
+    assert client.get("/api/advisor/workload").json() == []
+
+
+def test_advisor_suggests_benchmarked_index_for_full_scan(client, events):
+    for _ in range(3):
+        client.post("/api/query", json={"query": "SELECT * FROM events e WHERE e.kind = 'k7' ORDER BY e.id DESC"})
+    client.post("/api/query", json={"query": "SELECT * FROM events WHERE at = 5"})  # already indexed
+    client.get("/api/table/events/full")  # keyed page, nothing to fix
+    report = run_advisor(client)
+    assert report["status"] == "done"
+    assert [f["problems"] for f in report["findings"]] == [["Full scan of events"]]
+    [suggestion] = report["suggestions"]
+    assert suggestion["table"] == "events" and suggestion["columns"] == ["kind"]
+    assert suggestion["queries"][0]["count"] == 3 and suggestion["estimated_rows_avoided"] == 60000
+    assert suggestion["used_by_planner"] and suggestion["after_ms"] < suggestion["before_ms"]
+    # The benchmark ran on a copy: the live database is unchanged
+    assert [i["name"] for i in client.get("/api/indexes").json()] == ["events_at"]
+
+
+def test_advisor_suggests_index_that_removes_sort(client, events):
+    client.post("/api/query", json={"query": "SELECT kind, count(*) FROM events GROUP BY kind"})
+    report = run_advisor(client)
+    assert report["findings"][0]["problems"] == ["Temp B-tree for GROUP BY"]
+    assert report["suggestions"][0]["columns"] == ["kind"]
+    assert report["suggestions"][0]["reasons"] == ["sort (GROUP BY)"]
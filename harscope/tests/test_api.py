@@ -11,6 +11,9 @@ All tests use httpx.AsyncClient with ASGITransport for zero-network testing.
 
 import copy
 import json
+import os
+import sys
+import zlib
 
 import pytest
 
@@ -939,6 +942,37 @@ class TestValidate:
         assert resp.json()["results"][0]["status"] == "error"
 
 
+    async def test_validation_decodes_only_referenced_entries(self, client, monkeypatch):
+        from conftest import harscope_mod
+        har = copy.deepcopy(MINIMAL_HAR)
+        har["log"]["entries"] = har["log"]["entries"] * 20
+        await load_har(client, har)
+        decoded = []
+        decode = harscope_mod.LazyEntries._decode
+        monkeypatch.setattr(harscope_mod.LazyEntries, "_decode",
+                            lambda self, i: decoded.append(i) or decode(self, i))
+        edl = {"decisions": [{"entryIndex": 4, "location": "entries[4].request.headers[1].Authorization",
+                              "action": "keep"}]}
+        resp = await client.post("/api/validate", files={
+            "file": ("test.edl.json", json.dumps(edl).encode(), "application/json"),
+        })
+        assert resp.json()["summary"]["pass"] == 1
+        assert decoded == [4]
+
+    def test_cli_validates_against_a_loaded_file(self, tmp_path, capsys, monkeypatch):
+        from conftest import harscope_mod
+        har_path, edl_path = tmp_path / "s.har", tmp_path / "s.edl.json"
+        har_path.write_text(json.dumps(MINIMAL_HAR))
+        edl_path.write_text(json.dumps({"decisions": [
+            {"entryIndex": 0, "location": "entries[0].request.headers[1].Authorization", "action": "redact"}]}))
+        monkeypatch.setattr(sys, "argv", ["harscope", "--validate", str(har_path), "--edl", str(edl_path),
+                                          "-f", "json"])
+        with pytest.raises(SystemExit) as exit_info:
+            harscope_mod.main()
+        assert exit_info.value.code == 1
+        assert json.loads(capsys.readouterr().out)["summary"]["fail"] == 1
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # POST /api/export/csv — Export CSV
 # ═══════════════════════════════════════════════════════════════════════════
@@ -1729,3 +1763,513 @@ class TestInfoSeverityHandling:
         info_findings = [f for f in sec.json()["findings"] if f["severity"] == "info"]
         for f in info_findings:
             assert f["redact"] is False
+
+
+class TestStreamingLoader:
+    def _tricky_har(self):
+        har = copy.deepcopy(MINIMAL_HAR)
+        entry = har["log"]["entries"][0]
+        entry["response"]["content"]["text"] = 'brace } bracket ] quote \\" end \\\\'
+        entry["request"]["url"] = 'https://example.com/p?q="x"&r={y}'
+        har["log"]["comment"] = "entries ] } trailing"
+        har["extra"] = {"entries": []}
+        return har
+
+    def test_file_load_indexes_entries_without_full_decode(self, tmp_path):
+        from conftest import harscope_mod
+        har = self._tricky_har()
+        path = tmp_path / "tricky.har"
+        path.write_bytes(b"\xef\xbb\xbf" + json.dumps(har, indent=2).encode())
+
+        manager = harscope_mod.HARManager()
+        manager.load_file(str(path))
+        assert len(manager.entries) == 2
+        assert list(manager.entries) == har["log"]["entries"]
+        assert manager.entries[-1] == har["log"]["entries"][-1]
+        assert json.loads(manager.entries.raw(0)) == har["log"]["entries"][0]
+        assert manager._summaries[0]["url"] == har["log"]["entries"][0]["request"]["url"]
+        assert manager.log_meta["creator"] == {"name": "test", "version": "1.0"}
+        assert json.loads(manager._buffer[:]) == har
+        assert manager._summaries.entry_timings(0) == {
+            "blocked": 1, "dns": 5, "connect": 10, "ssl": 8, "send": 2, "wait": 60, "receive": 14}
+
+    def test_entry_cache_stays_bounded(self):
+        from conftest import harscope_mod
+        har = copy.deepcopy(MINIMAL_HAR)
+        har["log"]["entries"] = har["log"]["entries"] * 50
+        manager = harscope_mod.HARManager()
+        manager.from_content(json.dumps(har), "many.har")
+        for i in range(len(manager.entries)):
+            manager.entries[i]
+        assert len(manager.entries._cache) == harscope_mod.LazyEntries.CACHE_SIZE
+
+    @pytest.mark.parametrize("content, message", [
+        ('{"log": {"entries": [{"a": 1}, ', "Invalid JSON"),
+        ('{"log": {"entries": [{"a": "unterminated}]}}', "Invalid JSON"),
+        ('{"log": {"entries": []}} trailing', "Invalid JSON"),
+        ('{"log": {"entries": [{"a": 1,}]}}', "Invalid JSON"),
+        ('{"other": {}}', "missing 'log'"),
+        ('[1, 2]', "missing 'log'"),
+        ('', "Invalid JSON"),
+    ])
+    def test_malformed_input(self, content, message):
+        from conftest import harscope_mod
+        manager = harscope_mod.HARManager()
+        with pytest.raises(ValueError, match=message):
+            manager.from_content(content, "bad.har")
+        assert not manager.is_loaded
+
+
+class TestSummaryStore:
+    def _manager(self):
+        from conftest import harscope_mod
+        har = copy.deepcopy(MINIMAL_HAR)
+        base = har["log"]["entries"]
+        entries = []
+        hosts = ["api.example.com", "cdn.example.com", "auth.test.io"]
+        for n in range(300):
+            entry = copy.deepcopy(base[n % 2])
+            entry["request"]["url"] = f"https://{hosts[n % 3]}/Path/{n}?q=Get"
+            entry["request"]["method"] = "POST" if n % 4 == 0 else "GET"
+            entry["response"]["status"] = [200, 404, 500, 301][n % 4]
+            entry["startedDateTime"] = f"2024-01-01T00:00:{n % 60:02d}.000Z"
+            entries.append(entry)
+        har["log"]["entries"] = entries
+        manager = harscope_mod.HARManager()
+        manager.from_content(json.dumps(har), "cols.har")
+        return manager
+
+    def _reference(self, manager, filters):
+        rows = []
+        for s in manager._summaries:
+            if filters.get("domain") and s["domain"] != filters["domain"]:
+                continue
+            if filters.get("status") and s["statusGroup"] != filters["status"]:
+                continue
+            if filters.get("type") and s["contentType"] != filters["type"]:
+                continue
+            term = (filters.get("search") or "").lower()
+            if term and term not in s["url"].lower() and term not in s["method"].lower():
+                continue
+            rows.append(s["index"])
+        return rows
+
+    @pytest.mark.parametrize("filters", [
+        {},
+        {"domain": "cdn.example.com"},
+        {"status": "4xx", "domain": "api.example.com"},
+        {"type": "application/json", "status": "2xx"},
+        {"search": "path/1"},
+        {"search": "post"},
+        {"search": "get", "domain": "auth.test.io"},
+        {"search": "/7?q", "status": "5xx", "domain": "api.example.com"},
+        {"search": "getpost"},
+        {"search": "get\x00"},
+        {"domain": "missing.example"},
+    ])
+    def test_filters_match_row_scan(self, filters):
+        manager = self._manager()
+        assert list(manager._apply_filters(filters)) == self._reference(manager, filters)
+
+    def test_rows_round_trip(self):
+        manager = self._manager()
+        summary, _ = manager._summarize(5, manager.entries[5])
+        assert manager._summaries[5] == summary
+        assert manager._summaries[-1]["index"] == 299
+        assert [s["index"] for s in manager._summaries[2:4]] == [2, 3]
+
+    def test_waterfall_page_matches_full_computation(self):
+        manager = self._manager()
+        filters = {"domain": "api.example.com"}
+        rows = self._reference(manager, filters)
+        starts = [manager._summaries[i]["startMs"] for i in rows]
+        earliest = min(starts)
+        max_end = max(st - earliest + manager._summaries[i]["time"] for i, st in zip(rows, starts))
+
+        page = manager.get_waterfall_data(offset=20, limit=10, filters=filters)
+        assert page["total"] == len(rows)
+        assert [e["index"] for e in page["entries"]] == rows[20:30]
+        assert page["maxEndTime"] == round(max_end, 2)
+        first = page["entries"][0]
+        assert first["startOffset"] == round(first["startMs"] - earliest, 2)
+        assert manager.get_waterfall_data(offset=20, limit=10, filters=dict(filters)) == page
+
+    def test_stats_and_domains_from_columns(self):
+        manager = self._manager()
+        stats = manager.get_stats()
+        assert stats["totalRequests"] == 300
+        assert stats["statusCodes"] == {200: 75, 404: 75, 500: 75, 301: 75}
+        assert stats["errorCount"] == 150
+        assert stats["domains"] == {"api.example.com": 100, "cdn.example.com": 100, "auth.test.io": 100}
+        assert [d["count"] for d in manager.get_domains()] == [100, 100, 100]
+
+
+class TestParallelScan:
+    SECRETS = [
+        "Bearer abcdefghijklmnopqrstuvwxyz012345",
+        "ghp_" + "a" * 36,
+        "AKIA" + "B" * 16,
+        "sk-ant-" + "x" * 80,
+        "sk-" + "z" * 48,
+        "postgres://user:pw@db.internal:5432/app",
+        "alice@example.com from 192.168.1.20",
+    ]
+
+    def _secret_har(self, copies):
+        har = copy.deepcopy(MINIMAL_HAR)
+        entries = []
+        for n in range(copies):
+            for secret in self.SECRETS:
+                entry = copy.deepcopy(MINIMAL_HAR["log"]["entries"][n % 2])
+                entry["request"]["url"] = f"http://example.com/{n}"
+                entry["response"]["content"]["text"] = json.dumps({"note": secret, "n": n})
+                entries.append(entry)
+        har["log"]["entries"] = entries
+        return har
+
+    def _scan(self, har):
+        from conftest import harscope_mod
+        manager = harscope_mod.HARManager()
+        manager.from_content(json.dumps(har), "secrets.har")
+        scanner = harscope_mod.SecurityScanner()
+        scanner.scan(manager)
+        return scanner
+
+    def test_prefilter_selects_superset_of_matching_patterns(self):
+        from conftest import harscope_mod
+        scanner = harscope_mod.SecurityScanner()
+        for text in self.SECRETS + ["xsk-ant-" + "q" * 90, "SG.ghp_" + "a" * 36, "nothing here"]:
+            candidates = scanner._candidate_patterns(text)
+            for entry in scanner.PATTERNS:
+                if entry[0].search(text):
+                    assert entry in candidates, (text, entry[3])
+
+    def test_parallel_scan_matches_serial(self, monkeypatch):
+        from conftest import harscope_mod
+        har = self._secret_har(6)
+        serial = self._scan(har)
+        assert serial.last_scan["workers"] == 1
+
+        monkeypatch.setattr(harscope_mod, "SCAN_PARALLEL_MIN_ENTRIES", 1)
+        monkeypatch.setattr(harscope_mod.os, "cpu_count", lambda: 2)
+        parallel = self._scan(har)
+        assert parallel.last_scan["workers"] == 2
+        assert parallel.last_scan["entries"] == len(har["log"]["entries"])
+        assert parallel.findings == serial.findings
+        assert len(serial.findings) > len(har["log"]["entries"])
+
+    def test_pool_failure_falls_back_to_serial(self, monkeypatch):
+        from conftest import harscope_mod
+
+        class BrokenPool:
+            def __init__(self, *args, **kwargs):
+                raise OSError("no processes here")
+
+        har = self._secret_har(2)
+        serial = self._scan(har)
+        monkeypatch.setattr(harscope_mod, "SCAN_PARALLEL_MIN_ENTRIES", 1)
+        monkeypatch.setattr(harscope_mod.os, "cpu_count", lambda: 4)
+        monkeypatch.setattr(harscope_mod, "ProcessPoolExecutor", BrokenPool)
+        fallback = self._scan(har)
+        assert fallback.last_scan["workers"] == 1
+        assert fallback.findings == serial.findings
+
+    async def test_stats_report_scan_time(self, client):
+        await load_har(client)
+        resp = await client.get("/api/stats")
+        assert resp.status_code == 200
+        scan = resp.json()["scan"]
+        assert scan["entries"] == 2
+        assert scan["workers"] == 1
+        assert scan["seconds"] >= 0
+
+
+class TestRedactionOverlay:
+    def _loaded(self, har):
+        from conftest import harscope_mod
+        manager = harscope_mod.HARManager()
+        manager.from_content(json.dumps(har), "overlay.har")
+        scanner = harscope_mod.SecurityScanner()
+        scanner.scan(manager)
+        return harscope_mod, manager, scanner
+
+    def _har(self):
+        har = copy.deepcopy(MINIMAL_HAR)
+        har["log"]["entries"] = har["log"]["entries"] * 3
+        har["log"]["pages"] = [{"id": "page_1", "title": "Ünïcode ✓"}]
+        har["_exporter"] = {"entries": ["not", "these"]}
+        return har
+
+    def test_stream_matches_full_document_dump(self):
+        harscope_mod, manager, scanner = self._loaded(self._har())
+        manager.entries[0]  # warm the entry cache
+        streamed = b"".join(harscope_mod.ExportEngine.iter_sanitized_har(manager, scanner))
+        expected = json.dumps(harscope_mod.ExportEngine.sanitized_har(manager, scanner), indent=2)
+        assert streamed.decode("utf-8") == expected
+        exported = json.loads(streamed)
+        assert exported["_exporter"] == {"entries": ["not", "these"]}
+        assert exported["log"]["entries"][0]["request"]["headers"][1]["value"] == "[REDACTED]"
+        # The loaded HAR, including cached entries, is left untouched
+        assert manager.entries[0]["request"]["headers"][1]["value"] != "[REDACTED]"
+        assert json.loads(manager._buffer[:]) == self._har()
+
+    def test_empty_entries(self):
+        harscope_mod, manager, scanner = self._loaded({"log": {"version": "1.2", "entries": []}})
+        streamed = b"".join(harscope_mod.ExportEngine.iter_sanitized_har(manager, scanner))
+        assert json.loads(streamed) == {"log": {"version": "1.2", "entries": []}}
+
+    def test_stream_survives_loading_another_file(self, tmp_path):
+        from conftest import harscope_mod
+        first, second = tmp_path / "first.har", tmp_path / "second.har"
+        first.write_text(json.dumps(self._har()))
+        second.write_text(json.dumps(MINIMAL_HAR))
+        manager = harscope_mod.HARManager()
+        manager.load_file(str(first))
+        scanner = harscope_mod.SecurityScanner()
+        scanner.scan(manager)
+        expected = json.dumps(harscope_mod.ExportEngine.sanitized_har(manager, scanner), indent=2)
+        harscope_mod.ExportEngine.EXPORT_CHUNK_ENTRIES, chunk_entries = 1, \
+            harscope_mod.ExportEngine.EXPORT_CHUNK_ENTRIES
+        try:
+            stream = harscope_mod.ExportEngine.iter_sanitized_har(manager, scanner)
+            head = [next(stream), next(stream)]
+            pinned = manager._buffer
+            manager.load_file(str(second))
+            assert not pinned.closed
+            streamed = b"".join(head + list(stream))
+        finally:
+            harscope_mod.ExportEngine.EXPORT_CHUNK_ENTRIES = chunk_entries
+        assert streamed.decode("utf-8") == expected
+        assert pinned.closed and not manager._retired
+        # A stream dropped before its first chunk releases its pin too
+        stream = harscope_mod.ExportEngine.iter_sanitized_har(manager, scanner)
+        del stream
+        assert not manager._pins
+
+    def test_only_redacted_entries_are_copied(self):
+        harscope_mod, manager, scanner = self._loaded(self._har())
+        for f in scanner.findings:
+            f["redact"] = f["entryIndex"] == 1
+        overlay = harscope_mod.RedactionOverlay(scanner)
+        assert set(overlay.patches) == {1}
+        assert overlay.entry(manager, 0) is manager.entries[0]
+        assert overlay.entry(manager, 1) is not manager.entries[1]
+
+    def test_entry_detail_does_not_mutate_cached_entry(self):
+        har = copy.deepcopy(MINIMAL_HAR)
+        har["log"]["entries"][0]["response"]["content"]["text"] = "x" * 600_000
+        harscope_mod, manager, _ = self._loaded(har)
+        detail = manager.get_entry_detail(0)
+        assert detail["entry"]["response"]["content"]["_truncated"] is True
+        assert len(detail["entry"]["response"]["content"]["text"]) == manager.BODY_TRUNCATE
+        cached = manager.entries[0]
+        assert len(cached["response"]["content"]["text"]) == 600_000
+        assert "_truncated" not in cached["response"]["content"]
+        assert detail["entry"]["request"] is cached["request"]
+
+    async def test_csv_export_uses_redacted_url(self, client):
+        har = copy.deepcopy(MINIMAL_HAR)
+        har["log"]["entries"][0]["request"]["url"] = "http://example.com/api"
+        await load_har(client, har)
+        await client.post("/api/redaction/manual", json={
+            "entryIndex": 0, "location": "entries[0].request.url", "redact": True})
+        resp = await client.post("/api/export/csv")
+        rows = resp.text.strip().split("\n")
+        assert "[REDACTED]" in rows[1]
+        assert "http://example.com/api" not in resp.text
+
+
+class TestBatchCli:
+    def _tree(self, tmp_path):
+        (tmp_path / "a").mkdir(parents=True)
+        (tmp_path / "b").mkdir()
+        for rel in ("a/x.har", "b/x.har", "b/y.har"):
+            (tmp_path / rel).write_text(json.dumps(MINIMAL_HAR))
+        (tmp_path / "b" / "notes.txt").write_text("not a har")
+        return tmp_path
+
+    def test_parse_args_dispatch(self):
+        from conftest import harscope_mod
+        args = harscope_mod.parse_args(["sanitize", "dir", "-o", "out", "-j", "3"])
+        assert (args.command, args.paths, args.out, args.workers) == ("sanitize", ["dir"], "out", 3)
+        legacy = harscope_mod.parse_args(["capture.har", "--port", "9000"])
+        assert legacy.command is None and legacy.file_path == "capture.har"
+        assert legacy.cache is False
+        assert harscope_mod.parse_args(["capture.har", "--cache"]).cache is True
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_sanitize_directory(self, tmp_path, capsys, workers):
+        from conftest import harscope_mod
+        src = self._tree(tmp_path / "src")
+        out = tmp_path / "out"
+        args = harscope_mod.parse_args(["sanitize", str(src), "-o", str(out), "-j", str(workers)])
+        assert harscope_mod.run_batch(args) == 0
+
+        summary = json.loads((out / "summary.json").read_text())
+        assert summary["totals"]["files"] == 3
+        assert summary["totals"]["entries"] == 6
+        assert summary["totals"]["entriesPerSecond"] > 0
+        assert [r["file"] for r in summary["files"]] == sorted(r["file"] for r in summary["files"])
+        names = sorted(p.name for p in out.iterdir())
+        assert names == sorted([
+            "summary.json", "x_findings.csv", "x-2_findings.csv", "y_findings.csv",
+            "sanitized_x.har", "sanitized_x-2.har", "sanitized_y.har",
+            "sanitized_x.edl.json", "sanitized_x-2.edl.json", "sanitized_y.edl.json",
+        ])
+        sanitized = json.loads((out / "sanitized_y.har").read_text())
+        assert sanitized["log"]["entries"][0]["request"]["headers"][1]["value"] == "[REDACTED]"
+        edl = json.loads((out / "sanitized_y.edl.json").read_text())
+        assert harscope_mod.ExportEngine.validate_edl(sanitized["log"]["entries"], edl)["summary"]["valid"]
+        assert "entries/s" in capsys.readouterr().out
+
+    def test_scan_reports_failures(self, tmp_path, capsys):
+        from conftest import harscope_mod
+        src = self._tree(tmp_path / "src")
+        (src / "b" / "bad.har").write_text('{"log": ')
+        out = tmp_path / "out"
+        args = harscope_mod.parse_args(["scan", str(src / "b" / "*.har"), "-o", str(out), "-f", "json"])
+        assert harscope_mod.run_batch(args) == 1
+        summary = json.loads(capsys.readouterr().out)
+        assert summary["totals"]["failed"] == 1
+        assert [bool(r["error"]) for r in summary["files"]] == [True, False, False]
+        assert not any(p.name.endswith(".har") for p in out.iterdir())
+
+    def test_no_matches(self, tmp_path, capsys):
+        from conftest import harscope_mod
+        args = harscope_mod.parse_args(["scan", str(tmp_path / "*.har"), "-o", str(tmp_path / "out")])
+        assert harscope_mod.run_batch(args) == 1
+        assert "No HAR files matched" in capsys.readouterr().err
+
+
+class TestScanCache:
+    def _open(self, cache, har=None, manager=None, scanner=None):
+        from conftest import harscope_mod
+        manager = manager or harscope_mod.HARManager()
+        scanner = scanner or harscope_mod.SecurityScanner()
+        harscope_mod.open_capture(manager, scanner, content=json.dumps(har or MINIMAL_HAR),
+                                  filename="cached.har", cache=cache)
+        return manager, scanner
+
+    def test_reopen_reuses_index_and_findings(self, tmp_path):
+        from conftest import harscope_mod
+        cache = harscope_mod.ScanCache(tmp_path / "cache.sqlite3")
+        har = copy.deepcopy(MINIMAL_HAR)
+        har["log"]["entries"] = har["log"]["entries"] * 20
+        first, first_scan = self._open(cache, har)
+        assert not first.from_cache
+        second, second_scan = self._open(cache, har)
+        assert second.from_cache and second.sha256 == first.sha256
+        assert list(second._summaries) == list(first._summaries)
+        assert list(second.entries) == list(first.entries)
+        assert second.log_meta == first.log_meta
+        assert second.get_entries_page(0, 5, {"search": "post"}) == first.get_entries_page(0, 5, {"search": "post"})
+        assert [{**f, "preview": None} for f in second_scan.findings] == \
+            [{**f, "preview": None} for f in first_scan.findings]
+        assert second_scan.findings[0]["preview"] == first_scan.findings[0]["preview"][:4] + "..."
+        assert second_scan.last_scan["cached"] is True
+
+    def test_file_is_private_and_holds_no_plaintext(self, tmp_path):
+        from conftest import harscope_mod
+        path = tmp_path / "cache.sqlite3"
+        cache = harscope_mod.ScanCache(path)
+        har = copy.deepcopy(MINIMAL_HAR)
+        har["log"]["pages"] = [{"id": "page_1", "title": "https://example.com/secret-page"}]
+        manager, scanner = self._open(cache, har)
+        scanner.add_manual_redaction(1, "entries[1].request.url", "https://example.com/manual-secret")
+        cache.save_decisions(manager.sha256, scanner)
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+        import sqlite3
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            blobs = [r[0] for r in conn.execute("SELECT data FROM index_parts UNION ALL SELECT data FROM findings")]
+        stored = path.read_bytes() + b"".join(zlib.decompress(b) for b in blobs)
+        for secret in (b"example.com/api", b"secret-page", b"manual-secret",
+                       b"abc123def456", b"sk-proj-abc123"):
+            assert secret not in stored
+
+        reopened, _ = self._open(cache, har)
+        assert reopened.from_cache
+        assert reopened.log_meta == manager.log_meta
+        assert reopened._summaries.url == manager._summaries.url
+
+    def test_urls_not_found_verbatim_are_read_from_the_entry(self, tmp_path):
+        from conftest import harscope_mod
+        cache = harscope_mod.ScanCache(tmp_path / "cache.sqlite3")
+        content = json.dumps(MINIMAL_HAR).replace("/", "\\/")
+        for _ in range(2):
+            manager = harscope_mod.HARManager()
+            manager.from_content(content, "escaped.har", cache)
+        assert manager.from_cache
+        assert manager._summaries.url[1] == "http://example.com/api/submit"
+
+    def test_stale_decisions_expire(self, tmp_path, monkeypatch):
+        from conftest import harscope_mod
+        cache = harscope_mod.ScanCache(tmp_path / "cache.sqlite3")
+        manager, scanner = self._open(cache)
+        scanner.toggle_finding(scanner.findings[0]["id"])
+        cache.save_decisions(manager.sha256, scanner)
+        assert cache.load_decisions(manager.sha256)
+
+        monkeypatch.setattr(harscope_mod, "SCAN_CACHE_DECISIONS_TTL_S", -1)
+        assert cache.load_decisions(manager.sha256) is None
+        cache.save_decisions("other", scanner)
+        import sqlite3
+        with sqlite3.connect(tmp_path / "cache.sqlite3") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0] == 0
+
+    def test_older_cache_file_is_wiped(self, tmp_path):
+        from conftest import harscope_mod
+        import sqlite3
+        path = tmp_path / "cache.sqlite3"
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE decisions (sha256 TEXT, data TEXT, updated_at REAL)")
+            conn.execute("INSERT INTO decisions VALUES ('old', '{}', 0)")
+        cache = harscope_mod.ScanCache(path)
+        assert cache.load_decisions("old") is None
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == harscope_mod._SCAN_CACHE_VERSION
+
+    def test_decisions_survive_pattern_change(self, tmp_path, monkeypatch):
+        from conftest import harscope_mod
+        cache = harscope_mod.ScanCache(tmp_path / "cache.sqlite3")
+        manager, scanner = self._open(cache)
+        flipped = scanner.findings[0]
+        scanner.toggle_finding(flipped["id"])
+        scanner.add_manual_redaction(1, "entries[1].request.url", "https://example.com/x")
+        cache.save_decisions(manager.sha256, scanner)
+
+        monkeypatch.setattr(harscope_mod.SecurityScanner, "SCANNER_VERSION", 999)
+        _, rescanned = self._open(cache)
+        assert "cached" not in rescanned.last_scan
+        restored = {(f["entryIndex"], f["location"]): f["redact"] for f in rescanned.findings}
+        assert restored[(flipped["entryIndex"], flipped["location"])] == flipped["redact"]
+        assert (1, "entries[1].request.url") in rescanned.manual_redactions
+
+    def test_corrupt_entries_are_misses(self, tmp_path):
+        from conftest import harscope_mod
+        path = tmp_path / "cache.sqlite3"
+        cache = harscope_mod.ScanCache(path)
+        first, _ = self._open(cache)
+        import sqlite3
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE index_parts SET data = x'00'")
+            conn.execute("UPDATE findings SET data = x'00'")
+        manager, scanner = self._open(cache)
+        assert not manager.from_cache
+        assert list(manager._summaries) == list(first._summaries)
+        assert scanner.findings
+
+    async def test_api_toggles_are_persisted(self, client, tmp_path, monkeypatch):
+        from conftest import harscope_mod
+        monkeypatch.setattr(harscope_mod, "scan_cache", harscope_mod.ScanCache(tmp_path / "cache.sqlite3"))
+        await load_har(client)
+        findings = (await client.get("/api/security")).json()["findings"]
+        await client.post("/api/security/toggle", json={"id": findings[0]["id"]})
+
+        await load_har(client)
+        status = (await client.get("/api/status")).json()
+        assert status["fromCache"] is True
+        reopened = (await client.get("/api/security")).json()["findings"]
+        assert reopened[0]["redact"] != findings[0]["redact"]
+        assert [{**f, "preview": None} for f in reopened[1:]] == [{**f, "preview": None} for f in findings[1:]]
@@ -68,8 +68,10 @@ def readonly_json_file(tmp_path):
 def _reset_manager():
     """Reset the global json_manager before every test to avoid cross-test leakage."""
     jtree_mod.json_manager = None
+    jtree_mod._save_job = None
     yield
     jtree_mod.json_manager = None
+    jtree_mod._save_job = None
 
 
 @pytest.fixture()
@@ -93,3 +95,39 @@ def readonly_client(client, readonly_json_file):
     resp = client.post("/api/open", json={"path": readonly_json_file, "readonly": True})
     assert resp.status_code == 200
     return client
+
+
+@pytest.fixture()
+def lazy_backend(monkeypatch):
+    """Route every file open through the lazy backend regardless of size."""
+    monkeypatch.setattr(JSONManager, "MAX_FILE_SIZE", 0)
+    return jtree_mod
+
+
+@pytest.fixture()
+def small_history(monkeypatch):
+    """Shrink the undo/redo memory budget so trimming is easy to trigger."""
+    monkeypatch.setattr(JSONManager, "HISTORY_BUDGET", 4096)
+    return jtree_mod
+
+
+@pytest.fixture()
+def background_index(monkeypatch):
+    """Build every search index on a background thread, however small."""
+    monkeypatch.setattr(jtree_mod, "INDEX_SYNC_NODES", 0)
+    return jtree_mod
+
+
+@pytest.fixture()
+def background_save(monkeypatch):
+    """Run every save on the worker thread, however small the document."""
+    monkeypatch.setattr(jtree_mod, "SAVE_SYNC_NODES", 0)
+    return jtree_mod
+
+
+@pytest.fixture()
+def lazy_client(client, sample_json_file, lazy_backend):
+    """A TestClient with SAMPLE_DATA opened through the lazy backend."""
+    resp = client.post("/api/open", json={"path": sample_json_file})
+    assert resp.status_code == 200
+    return client
@@ -1,7 +1,7 @@
 """
 Comprehensive API tests for the jtree backend server.
 
-Endpoint inventory (20 routes):
+Endpoint inventory (21 routes):
   GET  /              - Serve SPA HTML
   GET  /api/status    - File/editor status
   POST /api/open      - Open file by server path
@@ -15,6 +15,7 @@ Endpoint inventory (20 routes):
   DELETE /api/node    - Delete node at path
   POST /api/rename    - Rename key in object
   POST /api/save      - Save to original file
+  GET  /api/save/progress - State of the latest save
   POST /api/save-as   - Save to new path
   GET  /api/download  - Download full JSON
   POST /api/undo      - Undo last mutation
@@ -30,6 +31,7 @@ Frontend feature tests:
 """
 import json
 import os
+import time
 import pytest
 
 from tests.conftest import SAMPLE_DATA
@@ -354,28 +356,28 @@ class TestSearch:
 
     def test_empty_query_returns_empty(self, loaded_client):
         data = loaded_client.get("/api/search", params={"q": ""}).json()
-        assert data == []
+        assert data["results"] == [] and data["total"] == 0
 
     def test_search_key_match(self, loaded_client):
-        data = loaded_client.get("/api/search", params={"q": "name", "type": "key"}).json()
+        data = loaded_client.get("/api/search", params={"q": "name", "type": "key"}).json()["results"]
         paths = [r["path"] for r in data]
         assert "name" in paths
 
     def test_search_value_match(self, loaded_client):
-        data = loaded_client.get("/api/search", params={"q": "jtree", "type": "value"}).json()
+        data = loaded_client.get("/api/search", params={"q": "jtree", "type": "value"}).json()["results"]
         assert any(r["preview"] == "jtree" for r in data)
 
     def test_search_both_default(self, loaded_client):
-        data = loaded_client.get("/api/search", params={"q": "deep"}).json()
+        data = loaded_client.get("/api/search", params={"q": "deep"}).json()["results"]
         # Should find "deep" as a key
         assert len(data) >= 1
 
     def test_search_case_insensitive(self, loaded_client):
-        data = loaded_client.get("/api/search", params={"q": "JTREE", "type": "value"}).json()
+        data = loaded_client.get("/api/search", params={"q": "JTREE", "type": "value"}).json()["results"]
         assert any(r["preview"] == "jtree" for r in data)
 
     def test_search_limit(self, loaded_client):
-        data = loaded_client.get("/api/search", params={"q": "e", "limit": 2}).json()
+        data = loaded_client.get("/api/search", params={"q": "e", "limit": 2}).json()["results"]
         assert len(data) <= 2
 
     def test_search_invalid_type_defaults_to_both(self, loaded_client):
@@ -383,11 +385,11 @@ class TestSearch:
         assert resp.status_code == 200
 
     def test_search_in_array_values(self, loaded_client):
-        data = loaded_client.get("/api/search", params={"q": "viewer", "type": "value"}).json()
+        data = loaded_client.get("/api/search", params={"q": "viewer", "type": "value"}).json()["results"]
         assert any(r["preview"] == "viewer" for r in data)
 
     def test_search_numeric_value(self, loaded_client):
-        data = loaded_client.get("/api/search", params={"q": "20", "type": "value"}).json()
+        data = loaded_client.get("/api/search", params={"q": "20", "type": "value"}).json()["results"]
         assert any("20" in r["preview"] for r in data)
 
 
@@ -980,6 +982,451 @@ class TestCopyPasteWorkflow:
         assert loaded_client.get("/api/node", params={"path": "temp"}).status_code == 404
 
 
+# ============================================================================
+# Lazy backend (files over MAX_FILE_SIZE)
+# ============================================================================
+
+class TestLazyBackend:
+    def test_status_reports_lazy(self, lazy_client):
+        assert lazy_client.get("/api/status").json()["lazy"] is True
+
+    def test_small_files_stay_in_memory(self, loaded_client):
+        assert loaded_client.get("/api/status").json()["lazy"] is False
+
+    def test_children_match_in_memory_backend(self, lazy_client, lazy_backend, sample_json_file):
+        eager = lazy_backend.JSONManager(sample_json_file, lazy=False)
+        strip = lambda node: {k: v for k, v in node.items() if k != "handle"}
+        for pointer in ("", "/nested", "/nested/b", "/tags"):
+            resp = lazy_client.get("/api/children", params={"pointer": pointer, "offset": 1, "limit": 2})
+            expected = eager.get_children(pointer, 1, 2)
+            assert [strip(c) for c in resp.json()["children"]] == [strip(c) for c in expected["children"]]
+            assert resp.json()["total"] == expected["total"]
+
+    def test_only_requested_containers_are_decoded(self, lazy_client, lazy_backend):
+        lazy_client.get("/api/children", params={"path": "nested"})
+        root = lazy_backend.json_manager.data
+        assert root._table is not None
+        assert root["nested"]._table is not None
+        assert root["tags"]._table is None
+
+    def test_strings_with_brackets(self, client, tmp_path, lazy_backend):
+        f = tmp_path / "brackets.json"
+        f.write_text('{"a": "]}{[", "b": ["\\"]", {"c": "{"}], "d": 1}')
+        client.post("/api/open", json={"path": str(f)})
+        assert client.get("/api/node", params={"path": "b.1.c"}).json()["value"] == "{"
+        assert client.get("/api/node", params={"path": "d"}).json()["value"] == 1
+
+    def test_invalid_json_returns_400(self, client, tmp_path, lazy_backend):
+        for text in ('{"a": [1}', '{"a": "x', '[1] [2]'):
+            f = tmp_path / "bad.json"
+            f.write_text(text)
+            resp = client.post("/api/open", json={"path": str(f)})
+            assert resp.status_code == 400, text
+
+    def test_edits_merge_on_save(self, lazy_client, sample_json_file):
+        lazy_client.put("/api/node", params={"path": "nested.b.1"}, json={"value": 99})
+        lazy_client.post("/api/node", params={"path": "tags"}, json={"value": "new"})
+        lazy_client.post("/api/rename", params={"path": "flag"}, json={"newKey": "enabled"})
+        lazy_client.delete("/api/node", params={"path": "nothing"})
+        assert lazy_client.post("/api/save").status_code == 200
+
+        with open(sample_json_file) as f:
+            saved = json.load(f)
+        expected = json.loads(json.dumps(SAMPLE_DATA))
+        expected["nested"]["b"][1] = 99
+        expected["tags"].append("new")
+        expected["enabled"] = expected.pop("flag")
+        del expected["nothing"]
+        assert saved == expected
+        assert list(saved) == list(expected)
+        assert lazy_client.get("/api/status").json()["dirty"] is False
+
+    def test_untouched_subtrees_copied_verbatim(self, client, tmp_path, lazy_backend):
+        f = tmp_path / "compact.json"
+        f.write_text('{"keep": {"x":[1,2,3]}, "edit": [1]}')
+        client.post("/api/open", json={"path": str(f)})
+        client.post("/api/node", params={"path": "edit"}, json={"value": 2})
+        client.post("/api/save")
+        text = f.read_text()
+        assert '{"x":[1,2,3]}' in text
+        assert json.loads(text) == {"keep": {"x": [1, 2, 3]}, "edit": [1, 2]}
+
+    def test_undo_redo(self, lazy_client):
+        lazy_client.put("/api/node", params={"path": "nested"}, json={"value": 0})
+        lazy_client.delete("/api/node", params={"path": "tags.0"})
+        assert lazy_client.post("/api/undo").status_code == 200
+        assert lazy_client.post("/api/undo").status_code == 200
+        data = lazy_client.get("/api/download").json()
+        assert data == SAMPLE_DATA
+        lazy_client.post("/api/redo")
+        assert lazy_client.get("/api/node", params={"path": "nested"}).json()["value"] == 0
+
+    def test_copy_returns_plain_value(self, lazy_client):
+        data = lazy_client.get("/api/copy", params={"path": "nested"}).json()
+        assert data["value"] == SAMPLE_DATA["nested"]
+        assert data["type"] == "dict"
+
+
+# ============================================================================
+# Node handles and JSON Pointer paths
+# ============================================================================
+
+class TestNodeHandles:
+    @pytest.fixture()
+    def dotted_client(self, client, tmp_path):
+        f = tmp_path / "dots.json"
+        f.write_text(json.dumps({"a.b": 1, "c": {"d.e": [10, 20]}, "x/y": {"~z": True}}))
+        assert client.post("/api/open", json={"path": str(f)}).status_code == 200
+        return client
+
+    def test_nodes_carry_pointer_and_handle(self, loaded_client):
+        children = loaded_client.get("/api/children", params={"path": "nested"}).json()["children"]
+        by_path = {c["path"]: c for c in children}
+        assert by_path["nested.b"]["pointer"] == "/nested/b"
+        assert isinstance(by_path["nested.b"]["handle"], int)
+        assert by_path["nested.a"]["handle"] is None
+
+    def test_children_by_handle(self, loaded_client):
+        handle = loaded_client.get("/api/node", params={"pointer": "/nested/b"}).json()["handle"]
+        resp = loaded_client.get("/api/children", params={"handle": handle, "offset": 1, "limit": 1})
+        assert resp.status_code == 200
+        assert resp.json()["children"][0]["pointer"] == "/nested/b/1"
+        assert resp.json()["children"][0]["value"] == 20
+
+    def test_handles_are_stable(self, loaded_client):
+        first = loaded_client.get("/api/node", params={"path": "nested.c"}).json()["handle"]
+        again = loaded_client.get("/api/node", params={"pointer": "/nested/c"}).json()["handle"]
+        assert first == again
+
+    def test_unknown_handle_returns_404(self, loaded_client):
+        assert loaded_client.get("/api/children", params={"handle": 999999}).status_code == 404
+
+    def test_mutation_invalidates_handles_below(self, loaded_client):
+        nested = loaded_client.get("/api/node", params={"pointer": "/nested"}).json()["handle"]
+        inner = loaded_client.get("/api/node", params={"pointer": "/nested/c"}).json()["handle"]
+        loaded_client.put("/api/node", params={"pointer": "/nested/c"}, json={"value": {"new": 1}})
+        assert loaded_client.get("/api/node", params={"handle": inner}).status_code == 404
+        assert loaded_client.get("/api/node", params={"handle": nested}).status_code == 200
+        node = loaded_client.get("/api/node", params={"pointer": "/nested/c"}).json()
+        assert node["childCount"] == 1 and node["handle"] != inner
+
+    def test_array_delete_invalidates_shifted_siblings(self, loaded_client):
+        loaded_client.post("/api/node", params={"pointer": "/nested/b"}, json={"value": [1]})
+        last = loaded_client.get("/api/node", params={"pointer": "/nested/b/3"}).json()["handle"]
+        loaded_client.delete("/api/node", params={"pointer": "/nested/b/0"})
+        assert loaded_client.get("/api/node", params={"handle": last}).status_code == 404
+        assert loaded_client.get("/api/node", params={"pointer": "/nested/b/2"}).json()["childCount"] == 1
+
+    def test_undo_invalidates_handles(self, loaded_client):
+        handle = loaded_client.get("/api/node", params={"pointer": "/nested"}).json()["handle"]
+        loaded_client.put("/api/node", params={"pointer": ""}, json={"value": {"nested": {}}})
+        assert loaded_client.get("/api/node", params={"handle": handle}).status_code == 404
+        loaded_client.post("/api/undo")
+        assert loaded_client.get("/api/node", params={"pointer": "/nested"}).json()["childCount"] == 3
+
+    def test_pointer_reaches_dotted_keys(self, dotted_client):
+        assert dotted_client.get("/api/node", params={"path": "a.b"}).status_code == 404
+        assert dotted_client.get("/api/node", params={"pointer": "/a.b"}).json()["value"] == 1
+        assert dotted_client.get("/api/node", params={"pointer": "/c/d.e/1"}).json()["value"] == 20
+        children = dotted_client.get("/api/children", params={"pointer": "/c"}).json()["children"]
+        assert children[0]["pointer"] == "/c/d.e"
+
+    def test_pointer_escapes(self, dotted_client):
+        node = dotted_client.get("/api/node", params={"pointer": "/x~1y/~0z"}).json()
+        assert node["value"] is True
+        children = dotted_client.get("/api/children", params={"pointer": ""}).json()["children"]
+        assert children[2]["pointer"] == "/x~1y"
+
+    def test_edit_dotted_keys_by_pointer(self, dotted_client):
+        assert dotted_client.put("/api/node", params={"pointer": "/a.b"}, json={"value": 2}).status_code == 200
+        assert dotted_client.post("/api/rename", params={"pointer": "/c/d.e"}, json={"newKey": "f.g"}).status_code == 200
+        assert dotted_client.post("/api/move", params={"pointer": "/c/f.g"}, json={"fromIndex": 0, "toIndex": 1}).status_code == 200
+        assert dotted_client.delete("/api/node", params={"pointer": "/x~1y"}).status_code == 200
+        data = dotted_client.get("/api/download").json()
+        assert data == {"a.b": 2, "c": {"f.g": [20, 10]}}
+        for _ in range(4):
+            assert dotted_client.post("/api/undo").status_code == 200
+        data = dotted_client.get("/api/download").json()
+        assert data == {"a.b": 1, "c": {"d.e": [10, 20]}, "x/y": {"~z": True}}
+
+    def test_invalid_pointer_returns_404(self, loaded_client):
+        assert loaded_client.get("/api/node", params={"pointer": "nested"}).status_code == 404
+        assert loaded_client.get("/api/node", params={"pointer": "/name/x"}).status_code == 404
+
+    def test_mutation_requires_path_or_pointer(self, loaded_client):
+        assert loaded_client.delete("/api/node").status_code == 422
+
+    def test_search_results_carry_pointer(self, dotted_client):
+        results = dotted_client.get("/api/search", params={"q": "d.e"}).json()["results"]
+        assert results[0]["pointer"] == "/c/d.e"
+
+    def test_copy_key_name_from_pointer(self, dotted_client):
+        assert dotted_client.get("/api/copy", params={"pointer": "/c/d.e"}).json()["key"] == "d.e"
+
+
+# ============================================================================
+# Search index
+# ============================================================================
+
+class TestSearchIndex:
+    def search(self, client, q, **params):
+        return client.get("/api/search", params={"q": q, **params}).json()
+
+    def pointers(self, client, q, **params):
+        return [(r["pointer"], r["matchType"]) for r in self.search(client, q, **params)["results"]]
+
+    def test_pagination_and_total(self, loaded_client):
+        full = self.search(loaded_client, "e", limit=500)
+        assert full["indexed"] is True and full["total"] == len(full["results"]) > 3
+        first = self.search(loaded_client, "e", limit=2)
+        second = self.search(loaded_client, "e", limit=2, offset=2)
+        assert first["total"] == full["total"] and first["hasMore"] is True
+        assert first["results"] + second["results"] == full["results"][:4]
+
+    def test_results_in_document_order(self, loaded_client):
+        assert self.pointers(loaded_client, "e", type="key") == [
+            ("/name", "key"), ("/version", "key"), ("/nested", "key"), ("/nested/c/deep", "key"),
+            ("/empty_obj", "key"), ("/empty_arr", "key")]
+
+    def test_prefix_mode_matches_word_starts(self, loaded_client):
+        assert ("/tags/2", "value") in self.pointers(loaded_client, "dit", type="value")
+        assert self.pointers(loaded_client, "dit", type="value", mode="prefix") == []
+        assert self.pointers(loaded_client, "edi", type="value", mode="prefix") == [("/tags/2", "value")]
+
+    def test_query_across_punctuation(self, client, tmp_path):
+        f = tmp_path / "text.json"
+        f.write_text(json.dumps({"msg": "Hello World-wide", "other": "lo W"}))
+        client.post("/api/open", json={"path": str(f)})
+        assert self.pointers(client, "o world-w") == [("/msg", "value")]
+        assert self.pointers(client, "lo w") == [("/msg", "value"), ("/other", "value")]
+        assert self.pointers(client, "-") == [("/msg", "value")]
+
+    def test_edits_update_index(self, loaded_client):
+        loaded_client.put("/api/node", params={"pointer": "/nested/a"}, json={"value": "zebra"})
+        loaded_client.post("/api/node", params={"pointer": "/tags"}, json={"value": {"zed": 1}})
+        loaded_client.post("/api/rename", params={"pointer": "/nested/c"}, json={"newKey": "zone"})
+        loaded_client.delete("/api/node", params={"pointer": "/tags/0"})
+        assert set(self.pointers(loaded_client, "z")) == {
+            ("/tags/2/zed", "key"), ("/nested/a", "value"), ("/nested/zone", "key")}
+
+    def test_undo_redo_update_index(self, loaded_client):
+        loaded_client.post("/api/rename", params={"pointer": "/flag"}, json={"newKey": "zflag"})
+        loaded_client.post("/api/undo")
+        assert self.pointers(loaded_client, "zflag") == []
+        assert self.pointers(loaded_client, "flag") == [("/flag", "key")]
+        loaded_client.post("/api/redo")
+        assert self.pointers(loaded_client, "flag") == [("/zflag", "key")]
+
+    def test_root_replace_reindexes(self, loaded_client):
+        loaded_client.put("/api/node", params={"pointer": ""}, json={"value": {"fresh": ["start"]}})
+        assert self.pointers(loaded_client, "jtree") == []
+        assert self.pointers(loaded_client, "start") == [("/fresh/0", "value")]
+
+    def test_background_build(self, background_index, client, sample_json_file):
+        client.post("/api/open", json={"path": sample_json_file})
+        assert background_index.json_manager.search_index.wait(5)
+        data = self.search(client, "viewer")
+        assert data["indexed"] is True and data["total"] == 1
+
+    def test_walks_tree_when_too_large_to_index(self, monkeypatch, background_index, client, sample_json_file):
+        monkeypatch.setattr(background_index.SearchIndex, "MAX_NODES", 3)
+        client.post("/api/open", json={"path": sample_json_file})
+        assert background_index.json_manager.search_index.wait(5) is False
+        data = self.search(client, "e", limit=2)
+        assert data["indexed"] is False and data["total"] is None
+        assert len(data["results"]) == 2 and data["hasMore"] is True
+
+    def test_lazy_backend_search(self, lazy_client, lazy_backend):
+        assert self.pointers(lazy_client, "deep") == [("/nested/c/deep", "key")]
+        # Indexing reads the mapped file without decoding views into the tree.
+        assert not lazy_backend.json_manager.data._cache
+
+    def test_lazy_index_keeps_spans_not_values(self, lazy_client, lazy_backend):
+        index = lazy_backend.json_manager.search_index
+        scalars = [e for e in index._entries() if e.children is None]
+        assert scalars and all(type(e.value) is lazy_backend._Span for e in scalars)
+        assert self.pointers(lazy_client, "editor", type="value") == [("/tags/2", "value")]
+        assert self.search(lazy_client, "editor", type="value")["results"][0]["preview"] == "editor"
+        lazy_client.put("/api/node", params={"pointer": "/tags/2"}, json={"value": "writer"})
+        assert self.pointers(lazy_client, "writer") == [("/tags/2", "value")]
+        assert self.pointers(lazy_client, "editor") == []
+
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_long_strings_are_scanned_not_tokenized(self, monkeypatch, lazy_backend, client, tmp_path, lazy):
+        jtree_mod = lazy_backend
+        monkeypatch.setattr(jtree_mod, "INDEX_MAX_TEXT", 32)
+        monkeypatch.setattr(jtree_mod.JSONManager, "MAX_FILE_SIZE", 0 if lazy else 1 << 30)
+        f = tmp_path / "long.json"
+        f.write_text(json.dumps({"blob": "filler " * 20 + "needle", "short": "needle"}))
+        client.post("/api/open", json={"path": str(f)})
+        tables = jtree_mod.json_manager.search_index._tables
+        assert len(tables.long) == 1 and "filler" not in tables.postings
+        assert self.pointers(client, "needle") == [("/blob", "value"), ("/short", "value")]
+        assert self.pointers(client, "filler needle") == [("/blob", "value")]
+        client.delete("/api/node", params={"pointer": "/blob"})
+        assert not tables.long
+        assert self.pointers(client, "needle") == [("/short", "value")]
+
+    def test_large_mapped_document_indexes_in_background(self, monkeypatch, lazy_backend, client, sample_json_file):
+        monkeypatch.setattr(lazy_backend, "INDEX_SYNC_BYTES", 16)
+        started = []
+        monkeypatch.setattr(lazy_backend.SearchIndex, "_run", lambda index: started.append(index))
+        client.post("/api/open", json={"path": sample_json_file})
+        index = lazy_backend.json_manager.search_index
+        assert started == [index] and not index.ready
+
+
+# ============================================================================
+# Inverse-patch edit history
+# ============================================================================
+
+class TestEditHistory:
+    def test_delete_undo_restores_key_position(self, loaded_client):
+        loaded_client.delete("/api/node", params={"pointer": "/nested/b"})
+        loaded_client.post("/api/undo")
+        assert list(loaded_client.get("/api/download").json()["nested"]) == ["a", "b", "c"]
+
+    def test_rename_undo_restores_key_position(self, loaded_client):
+        loaded_client.post("/api/rename", params={"pointer": "/nested/a"}, json={"newKey": "z"})
+        assert list(loaded_client.get("/api/download").json()["nested"]) == ["z", "b", "c"]
+        loaded_client.post("/api/undo")
+        assert list(loaded_client.get("/api/download").json()["nested"]) == ["a", "b", "c"]
+
+    def test_undo_restores_detached_subtree_without_copying(self, loaded_client, lazy_backend):
+        manager = lazy_backend.json_manager
+        before = manager.data["nested"]
+        loaded_client.put("/api/node", params={"pointer": "/nested"}, json={"value": 1})
+        loaded_client.post("/api/undo")
+        assert manager.data["nested"] is before
+
+    def test_redo_after_undo(self, loaded_client):
+        loaded_client.post("/api/node", params={"pointer": "/tags"}, json={"value": "x"})
+        loaded_client.post("/api/undo")
+        assert loaded_client.post("/api/redo").status_code == 200
+        assert loaded_client.get("/api/download").json()["tags"][-1] == "x"
+
+    def test_new_edit_clears_redo(self, loaded_client):
+        loaded_client.put("/api/node", params={"pointer": "/version"}, json={"value": 2})
+        loaded_client.post("/api/undo")
+        loaded_client.put("/api/node", params={"pointer": "/version"}, json={"value": 3})
+        assert loaded_client.get("/api/status").json()["canRedo"] is False
+
+    def test_paste_is_undoable(self, loaded_client):
+        resp = loaded_client.post("/api/paste", params={"pointer": "/nested"},
+                                  json={"key": "d", "value": {"x": [1]}})
+        assert resp.status_code == 200
+        loaded_client.post("/api/undo")
+        assert "d" not in loaded_client.get("/api/download").json()["nested"]
+
+    def test_budget_drops_oldest_entries(self, small_history, client, sample_json_file):
+        client.post("/api/open", json={"path": sample_json_file})
+        for i in range(3):
+            client.put("/api/node", params={"pointer": "/tags"}, json={"value": ["v" * 2048] * (i + 1)})
+        history = small_history.json_manager.history
+        assert len(history.undo_stack) < 3
+        assert history.size <= small_history.JSONManager.HISTORY_BUDGET or len(history.undo_stack) == 1
+        assert client.post("/api/undo").status_code == 200
+
+    def test_oversized_edit_stays_undoable(self, small_history, client, sample_json_file):
+        client.post("/api/open", json={"path": sample_json_file})
+        client.put("/api/node", params={"pointer": ""}, json={"value": ["v" * 8192]})
+        client.put("/api/node", params={"pointer": ""}, json={"value": 0})
+        assert len(small_history.json_manager.history.undo_stack) == 1
+        client.post("/api/undo")
+        assert client.get("/api/download").json() == ["v" * 8192]
+
+    def test_retained_size_counts_only_decoded_lazy_children(self, lazy_client, lazy_backend):
+        root = lazy_backend.json_manager.data
+        untouched = lazy_backend.retained_size(root, 1 << 30)
+        root["nested"]["c"]
+        assert lazy_backend.retained_size(root, 1 << 30) > untouched
+
+
+# ============================================================================
+# Streaming, atomic saves
+# ============================================================================
+
+def _wait_for_save(client):
+    for _ in range(500):
+        job = client.get("/api/save/progress").json()
+        if job["state"] != "running":
+            return job
+        time.sleep(0.01)
+    raise AssertionError("save did not finish")
+
+
+class TestStreamingSave:
+    def test_progress_idle_before_any_save(self, client):
+        assert client.get("/api/save/progress").json() == {"state": "idle"}
+
+    def test_minified_save_as(self, loaded_client, tmp_path):
+        target = tmp_path / "min.json"
+        resp = loaded_client.post("/api/save-as", json={"path": str(target), "format": "minified"})
+        assert resp.json()["job"]["state"] == "done"
+        text = target.read_text()
+        assert text == json.dumps(SAMPLE_DATA, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+    def test_minified_save_of_lazy_document(self, lazy_client, sample_json_file):
+        lazy_client.put("/api/node", params={"pointer": "/version"}, json={"value": 7})
+        assert lazy_client.post("/api/save", json={"format": "minified"}).status_code == 200
+        text = open(sample_json_file).read()
+        assert "\n" not in text.strip()
+        assert json.loads(text) == {**SAMPLE_DATA, "version": 7}
+
+    def test_unknown_format_returns_400(self, loaded_client):
+        assert loaded_client.post("/api/save", json={"format": "yaml"}).status_code == 400
+        assert loaded_client.get("/api/download", params={"format": "yaml"}).status_code == 400
+
+    def test_download_minified(self, loaded_client):
+        resp = loaded_client.get("/api/download", params={"format": "minified"})
+        assert resp.text == json.dumps(SAMPLE_DATA, separators=(",", ":"), ensure_ascii=False)
+
+    def test_save_leaves_no_temp_file_and_keeps_mode(self, loaded_client, sample_json_file):
+        os.chmod(sample_json_file, 0o640)
+        loaded_client.post("/api/save")
+        assert not os.path.exists(sample_json_file + ".jtree-tmp")
+        assert os.stat(sample_json_file).st_mode & 0o777 == 0o640
+
+    def test_background_save_reports_progress(self, background_save, loaded_client, sample_json_file):
+        loaded_client.put("/api/node", params={"pointer": "/version"}, json={"value": 5})
+        resp = loaded_client.post("/api/save").json()
+        assert resp["pending"] is True
+        job = _wait_for_save(loaded_client)
+        assert job["state"] == "done" and job["progress"] == 1.0
+        assert job["written"] == os.path.getsize(sample_json_file)
+        assert json.load(open(sample_json_file))["version"] == 5
+        assert loaded_client.get("/api/status").json()["dirty"] is False
+
+    def test_second_save_while_running_returns_409(self, background_save, loaded_client):
+        with background_save._manager_lock:
+            assert loaded_client.post("/api/save").json()["pending"] is True
+            assert loaded_client.post("/api/save").status_code == 409
+        assert _wait_for_save(loaded_client)["state"] == "done"
+
+    def test_failed_save_keeps_original(self, background_save, loaded_client, sample_json_file, monkeypatch):
+        before = open(sample_json_file).read()
+
+        def broken(*args, **kwargs):
+            yield b'{"partial": '
+            raise OSError("disk full")
+
+        monkeypatch.setattr(background_save, "iter_json", broken)
+        loaded_client.put("/api/node", params={"pointer": "/version"}, json={"value": 5})
+        loaded_client.post("/api/save")
+        job = _wait_for_save(loaded_client)
+        assert job["state"] == "failed" and "disk full" in job["error"]
+        assert open(sample_json_file).read() == before
+        assert not os.path.exists(sample_json_file + ".jtree-tmp")
+        assert loaded_client.get("/api/status").json()["dirty"] is True
+
+    def test_minify_json_across_chunk_boundaries(self, lazy_backend):
+        raw = json.dumps({"a b": ["x \\\" y", {"k": " \\"}], "n": [1, 2]}, indent=2).encode()
+        for size in range(1, 8):
+            chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+            out = b"".join(lazy_backend.minify_json(iter(chunks)))
+            assert out == json.dumps(json.loads(raw), separators=(",", ":")).encode()
+
+
 # ============================================================================
 # Regression tests for audit findings
 # ============================================================================
@@ -1,5 +1,6 @@
 import importlib.machinery
 import importlib.util
+import json
 import sqlite3
 import sys
 import uuid
@@ -223,3 +224,68 @@ def test_rebuild_timestamps_requires_confirm(monkeypatch, tmp_path):
     r = client.post("/api/admin/rebuild-timestamps")
     assert r.status_code == 400
     assert "confirm=true" in r.json().get("error", "")
+
+
+def test_csv_import_batches_rows_and_refreshes_only_touched_days(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, db_path = build_client(module, monkeypatch, tmp_path)
+    monkeypatch.setattr(module, "IMPORT_BATCH_SIZE", 2)
+    rows = [
+        f"gen-batch-{i},2026-04-1{i % 3}T10:00:00Z,openai/gpt-4o-mini,OpenAI,Primary,App,"
+        f"10,20,0,0,0.1,0,0,0,{100 + i},stop,true,false,0,u,50"
+        for i in range(7)
+    ]
+    rows.append(",2026-04-10T10:00:00Z,openai/gpt-4o-mini,OpenAI,Primary,App,1,1,0,0,0,0,0,0,1,stop,true,false,0,u,1")
+    first = client.post("/api/import/csv",
+        files={"file": ("activity.csv", _BASE_CSV_COLUMNS + "\n" + "\n".join(rows) + "\n", "text/csv")})
+    assert first.json() == {"status": "ok", "inserted": 7, "skipped": 1}
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("UPDATE daily_summaries SET request_count = 99 WHERE date = '2026-04-10'")
+        conn.commit()
+    finally:
+        conn.close()
+
+    later = _csv("gen-batch-late,2026-04-12T11:00:00Z,openai/gpt-4o-mini,OpenAI,Primary,App,"
+                 "10,20,0,0,0.1,0,0,0,100,stop,true,false,0,u,50")
+    second = client.post("/api/import/csv", files={"file": ("activity.csv", later, "text/csv")})
+    assert second.json() == {"status": "ok", "inserted": 1, "skipped": 0}
+
+    conn = sqlite3.connect(db_path)
+    try:
+        counts = dict(conn.execute("SELECT date, request_count FROM daily_summaries").fetchall())
+    finally:
+        conn.close()
+    # 2026-04-10 was untouched by the second import, so its row was left alone.
+    assert counts == {"2026-04-10": 99, "2026-04-11": 2, "2026-04-12": 3}
+
+
+def test_csv_import_reports_progress_over_sse(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, monkeypatch, tmp_path)
+    row = "gen-progress,2026-04-13T10:00:00Z,openai/gpt-4o-mini,OpenAI,Primary,App,10,20,0,0,0.1,0,0,0,100,stop,true,false,0,u,50"
+    r = client.post("/api/import/csv?import_id=abc123",
+        files={"file": ("activity.csv", _csv(row), "text/csv")})
+    assert r.status_code == 200
+
+    stream = client.get("/api/import/progress/abc123")
+    assert stream.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in stream.text.splitlines()
+              if line.startswith("data: ")]
+    assert events[-1]["phase"] == "done"
+    assert events[-1]["rows"] == 1
+    assert events[-1]["inserted"] == 1
+
+
+def test_finished_import_progress_expires_without_a_subscriber(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, monkeypatch, tmp_path)
+    monkeypatch.setattr(module, "IMPORT_PROGRESS_TTL_S", 0)
+    row = "gen-unwatched,2026-04-13T10:00:00Z,openai/gpt-4o-mini,OpenAI,Primary,App,10,20,0,0,0.1,0,0,0,100,stop,true,false,0,u,50"
+    client.post("/api/import/csv?import_id=unwatched", files={"file": ("activity.csv", _csv(row), "text/csv")})
+    assert module._import_progress["unwatched"]["phase"] == "done"
+    # Nobody opened the progress stream; the next progress update drops it.
+    client.post("/api/import/csv?import_id=next", files={"file": ("activity.csv", _csv(row), "text/csv")})
+    assert "unwatched" not in module._import_progress
+    assert "unwatched" not in module._import_progress_expiry
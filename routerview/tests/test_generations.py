@@ -0,0 +1,326 @@
+import asyncio
+import csv
+import importlib.machinery
+import importlib.util
+import io
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / "routerview"
+
+
+def load_module(monkeypatch, runtime_home: Path):
+    monkeypatch.setenv("ROUTERVIEW_HOME", str(runtime_home))
+    python_multipart = ModuleType("python_multipart")
+    python_multipart.__version__ = "0.0.20"
+    monkeypatch.setitem(sys.modules, "python_multipart", python_multipart)
+    module_name = f"routerview_generations_{uuid.uuid4().hex}"
+    loader = importlib.machinery.SourceFileLoader(module_name, str(SCRIPT_PATH))
+    spec = importlib.util.spec_from_loader(module_name, loader)
+    assert spec is not None
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_client(module, tmp_path: Path):
+    db_path = tmp_path / "routerview.db"
+    module.init_database(str(db_path))
+    module._db_path = str(db_path)
+    return TestClient(module.app), db_path
+
+
+_CSV_HEADER = (
+    "generation_id,created_at,model_permaslug,provider_name,api_key_name,app_name,"
+    "tokens_prompt,tokens_completion,tokens_reasoning,tokens_cached,cost_total,"
+    "cost_cache,cost_web_search,cost_file_processing,generation_time_ms,"
+    "finish_reason_normalized,streamed,cancelled,num_search_results,user,"
+    "time_to_first_token_ms"
+)
+_MODELS = ["openai/gpt-4o-mini", "anthropic/claude-3.7-sonnet", "google/gemini-2.0-flash"]
+_PROVIDERS = ["OpenAI", "Anthropic", "Google"]
+
+
+def _import_log(client, count=37):
+    lines = [_CSV_HEADER]
+    for i in range(count):
+        # Repeated timestamps and costs plus missing latencies exercise the
+        # id tiebreak and NULL ordering.
+        latency = "" if i % 5 == 0 else str(100 + i % 7)
+        lines.append(
+            f"gen-{i:03d},2026-04-10T{i % 4:02d}:00:00Z,{_MODELS[i % 3]},{_PROVIDERS[i % 3]},"
+            f"Primary,App,10,{i % 6},0,0,{0.001 * (i % 4)},0,0,0,{latency},stop,true,false,0,u,50"
+        )
+    r = client.post("/api/import/csv",
+        files={"file": ("activity.csv", "\n".join(lines) + "\n", "text/csv")})
+    assert r.status_code == 200
+
+
+_RANGE = {"from": "2026-04-10T00:00:00Z", "to": "2026-04-11T00:00:00Z"}
+
+
+def _walk(client, **params):
+    ids, cursor = [], None
+    while True:
+        query = {**_RANGE, "page_size": 5, **params}
+        if cursor:
+            query["cursor"] = cursor
+        body = client.get("/api/generations", params=query).json()
+        ids += [row["id"] for row in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids
+
+
+def test_keyset_pages_match_offset_order_for_every_sort(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_log(client)
+
+    for sort in ("created_at", "cost_usd", "generation_time_ms", "tokens_total"):
+        for order in ("asc", "desc"):
+            full = client.get("/api/generations", params={
+                **_RANGE, "page_size": 250, "sort": sort, "order": order,
+            }).json()
+            assert full["next_cursor"] is None
+            expected = [row["id"] for row in full["data"]]
+            assert len(expected) == 37
+            assert _walk(client, sort=sort, order=order) == expected, (sort, order)
+
+
+def test_rejects_malformed_cursor(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    r = client.get("/api/generations", params={**_RANGE, "cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    assert "cursor" in r.json()["error"]
+
+
+def test_search_uses_fts_index_and_stays_in_sync(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, db_path = build_client(module, tmp_path)
+    _import_log(client)
+
+    def search(term):
+        body = client.get("/api/generations", params={**_RANGE, "search": term,
+                                                       "page_size": 250}).json()
+        return sorted(row["id"] for row in body["data"]), body["total"]
+
+    ids, total = search("LAUDE-3.7")  # substring, case-insensitive
+    assert total == len(ids) == 12
+    assert all(int(i[4:]) % 3 == 1 for i in ids)
+    assert search("gen-03")[1] == 7
+    assert search("oo")[1] == 12  # below trigram length: LIKE fallback
+
+    conn = sqlite3.connect(db_path)
+    try:
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM generations WHERE rowid IN "
+            "(SELECT rowid FROM generations_fts WHERE generations_fts MATCH '\"claude\"')"))
+        assert "VIRTUAL TABLE INDEX" in plan
+        conn.execute("DELETE FROM generations WHERE id = 'gen-001'")
+        conn.commit()
+    finally:
+        conn.close()
+    assert search("claude")[1] == 11
+
+
+def test_search_index_is_backfilled_for_existing_databases(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, db_path = build_client(module, tmp_path)
+    _import_log(client)
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        DROP TRIGGER generations_fts_ai; DROP TRIGGER generations_fts_ad;
+        DROP TRIGGER generations_fts_au; DROP TABLE generations_fts;
+    """)
+    conn.close()
+
+    module.init_database(str(db_path))
+    body = client.get("/api/generations", params={**_RANGE, "search": "gemini"}).json()
+    assert body["total"] == 12
+
+
+def test_approximate_totals(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_log(client)
+
+    body = client.get("/api/generations", params={**_RANGE, "total": "approx",
+                                                   "provider": "OpenAI"}).json()
+    assert body["total"] == 13
+    assert body["total_approx"] is False
+
+    monkeypatch.setattr(module, "APPROX_TOTAL_CAP", 5)
+    body = client.get("/api/generations", params={**_RANGE, "total": "approx",
+                                                   "search": "gen-", "page_size": 10}).json()
+    assert body["total"] == 5
+    assert body["total_approx"] is True
+    assert body["next_cursor"]
+
+    body = client.get("/api/generations", params={**_RANGE, "total": "none"}).json()
+    assert body["total"] is None and body["pages"] is None
+
+
+def test_csv_export_streams_generations_in_chunks(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_log(client)
+    monkeypatch.setattr(module, "EXPORT_CHUNK_ROWS", 10)
+
+    r = client.get("/api/export/csv", params={**_RANGE, "view": "generations"})
+    assert r.status_code == 200
+    assert "content-length" not in r.headers
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert rows[0][0] == "id" and len(rows) == 38
+
+    async def collect():
+        from_s, to_s = module.parse_time_range("custom", _RANGE["from"], _RANGE["to"], "UTC")
+        where, params = module._export_where(from_s, to_s, "", [])
+        return [chunk async for chunk in module._stream_generations_csv(where, params)]
+    chunks = asyncio.run(collect())
+    assert [c.count(b"\n") for c in chunks] == [11, 10, 10, 7]
+    assert b"".join(chunks).decode() == r.text
+
+    empty = client.get("/api/export/csv", params={"from": "2020-01-01T00:00:00Z",
+                                                  "to": "2020-01-02T00:00:00Z"})
+    assert empty.text == ""
+
+
+def test_open_export_streams_leave_pooled_readers_free(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_log(client)
+    monkeypatch.setattr(module, "EXPORT_CHUNK_ROWS", 10)
+
+    async def scenario():
+        from_s, to_s = module.parse_time_range("custom", _RANGE["from"], _RANGE["to"], "UTC")
+        where, params = module._export_where(from_s, to_s, "", [])
+        pool = await module.get_pool()
+        acquired = pool._waits["read"]["acquired"]
+        streams = [module._stream_generations_csv(where, params)
+                   for _ in range(module.READ_POOL_SIZE)]
+        for stream in streams:
+            await stream.__anext__()
+        held = pool._waits["read"]["acquired"] - acquired
+        for stream in streams:
+            await stream.aclose()
+        return held
+    assert asyncio.run(scenario()) == 0
+
+
+def test_parquet_export_round_trips(monkeypatch, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_log(client)
+    monkeypatch.setattr(module, "EXPORT_CHUNK_ROWS", 10)
+
+    r = client.get("/api/export/parquet", params={**_RANGE, "provider": "Google"})
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.num_rows == 12
+    assert pq.ParquetFile(io.BytesIO(r.content)).num_row_groups == 2
+    assert str(table.schema.field("streamed").type) == "bool"
+    assert str(table.schema.field("tokens_total").type) == "int64"
+    assert set(table.column("provider_name").to_pylist()) == {"Google"}
+
+    r = client.get("/api/export/parquet", params={"from": "2020-01-01T00:00:00Z",
+                                                  "to": "2020-01-02T00:00:00Z"})
+    assert pq.read_table(io.BytesIO(r.content)).num_rows == 0
+
+
+def test_parquet_export_reports_missing_pyarrow(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    r = client.get("/api/export/parquet", params=_RANGE)
+    assert r.status_code == 501
+    assert "pyarrow" in r.json()["error"]
+
+
+def _import_rows(client, rows, prefix):
+    lines = [_CSV_HEADER]
+    for i, (ts, model, provider, cost, latency) in enumerate(rows):
+        lines.append(
+            f"{prefix}-{i},{ts},{model},{provider},Primary,App,10,20,0,0,{cost},0,0,0,"
+            f"{latency},stop,true,false,0,u,50"
+        )
+    r = client.post("/api/import/csv",
+        files={"file": ("activity.csv", "\n".join(lines) + "\n", "text/csv")})
+    assert r.status_code == 200
+
+
+def _baselines(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {(r[0], r[1]): r[2:] for r in conn.execute(
+            "SELECT scope, key, samples, cost_mean, latency_mean FROM anomaly_baselines")}
+    finally:
+        conn.close()
+
+
+def test_anomaly_baselines_update_incrementally_and_flag_outliers(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, db_path = build_client(module, tmp_path)
+    normal = [(f"2026-04-10T{i % 24:02d}:{i % 60:02d}:00Z", "openai/gpt-4o-mini", "OpenAI",
+               0.010 + 0.001 * (i % 3), 100 + i % 5) for i in range(60)]
+    _import_rows(client, normal, "base")
+    baselines = _baselines(db_path)
+    assert baselines[("model", "gpt-4o-mini")][0] == 60
+    assert abs(baselines[("model", "gpt-4o-mini")][1] - 0.011) < 1e-6
+    assert baselines[("provider", "OpenAI")][0] == 60
+
+    _import_rows(client, [
+        ("2026-04-11T10:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.011, 101),
+        ("2026-04-11T11:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.5, 102),
+        ("2026-04-11T12:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.012, 9000),
+        # Too few samples for a model baseline: judged against the provider's.
+        ("2026-04-11T13:00:00Z", "openai/o3-mini", "OpenAI", 0.9, 100),
+    ], "next")
+    assert _baselines(db_path)[("model", "gpt-4o-mini")][0] == 63
+
+    params = {"from": "2026-04-11T00:00:00Z", "to": "2026-04-12T00:00:00Z"}
+    body = client.get("/api/anomalies", params=params).json()
+    flagged = {row["id"]: row["anomalies"] for row in body["data"]}
+    assert flagged == {"next-1": ["high_cost"], "next-2": ["high_latency"],
+                       "next-3": ["high_cost"]}
+    assert [row["id"] for row in body["data"]] == ["next-3", "next-2", "next-1"]
+
+    only_latency = client.get("/api/anomalies", params={**params, "flag": "high_latency"}).json()
+    assert [row["id"] for row in only_latency["data"]] == ["next-2"]
+
+    first = client.get("/api/anomalies", params={**params, "limit": 2}).json()
+    rest = client.get("/api/anomalies", params={**params, "limit": 2,
+                                                "cursor": first["next_cursor"]}).json()
+    assert [r["id"] for r in first["data"] + rest["data"]] == ["next-3", "next-2", "next-1"]
+    assert rest["next_cursor"] is None
+
+    log = client.get("/api/generations", params=params).json()
+    assert {row["id"]: row["anomalies"] for row in log["data"]}["next-1"] == ["high_cost"]
+
+
+def test_anomaly_baselines_backfill_for_existing_databases(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, db_path = build_client(module, tmp_path)
+    _import_log(client)
+    before = _baselines(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM anomaly_baselines")
+    conn.commit()
+    conn.close()
+
+    module.init_database(str(db_path))
+    after = _baselines(db_path)
+    assert after.keys() == before.keys()
+    for key, (samples, cost, latency) in after.items():
+        assert samples == before[key][0]
+        assert abs(cost - before[key][1]) < 1e-9
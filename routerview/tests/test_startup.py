@@ -96,3 +96,49 @@ def test_health_endpoint_reports_zero_connected_clients_without_websocket_manage
 
     assert response.status_code == 200
     assert response.json()["connected_clients"] == 0
+
+
+def test_health_reports_pool_metrics_and_reuses_connections(monkeypatch, tmp_path):
+    module = load_module(monkeypatch)
+    db_path = tmp_path / "routerview.db"
+    module.init_database(str(db_path))
+    module._db_path = str(db_path)
+
+    with TestClient(module.app) as client:
+        for _ in range(5):
+            assert client.get("/api/dimensions").status_code == 200
+        pool = client.get("/api/health").json()["pool"]
+
+    assert pool["size"] == module.READ_POOL_SIZE
+    assert pool["open_readers"] == 1
+    assert pool["read"]["acquired"] == 6
+    assert set(pool["read"]) >= {"avg_wait_ms", "max_wait_ms", "total_wait_ms", "waited"}
+    assert module._pool.stats()["open_readers"] == 0
+
+
+def test_pooled_readers_are_read_only(monkeypatch, tmp_path):
+    module = load_module(monkeypatch)
+    db_path = tmp_path / "routerview.db"
+    module.init_database(str(db_path))
+    module._db_path = str(db_path)
+
+    async def scenario():
+        pool = await module.get_pool()
+        try:
+            async with pool.read() as db:
+                try:
+                    await db.execute("INSERT INTO settings (key, value) VALUES ('a', 'b')")
+                except module.sqlite3.OperationalError:
+                    pass
+                else:
+                    raise AssertionError("reader accepted a write")
+            async with pool.write() as db:
+                await db.execute("INSERT INTO settings (key, value) VALUES ('a', 'b')")
+                await db.commit()
+            async with pool.read() as db:
+                cur = await db.execute("SELECT value FROM settings WHERE key='a'")
+                return (await cur.fetchone())[0]
+        finally:
+            await pool.close()
+
+    assert module.asyncio.run(scenario()) == "b"
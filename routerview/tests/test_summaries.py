@@ -0,0 +1,258 @@
+import importlib.machinery
+import importlib.util
+import random
+import sys
+import uuid
+from pathlib import Path
+from types import ModuleType
+
+from fastapi.testclient import TestClient
+
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / "routerview"
+
+
+def load_module(monkeypatch, runtime_home: Path):
+    monkeypatch.setenv("ROUTERVIEW_HOME", str(runtime_home))
+    python_multipart = ModuleType("python_multipart")
+    python_multipart.__version__ = "0.0.20"
+    monkeypatch.setitem(sys.modules, "python_multipart", python_multipart)
+    module_name = f"routerview_summaries_{uuid.uuid4().hex}"
+    loader = importlib.machinery.SourceFileLoader(module_name, str(SCRIPT_PATH))
+    spec = importlib.util.spec_from_loader(module_name, loader)
+    assert spec is not None
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_client(module, tmp_path: Path):
+    db_path = tmp_path / "routerview.db"
+    module.init_database(str(db_path))
+    module._db_path = str(db_path)
+    return TestClient(module.app), db_path
+
+
+_CSV_HEADER = (
+    "generation_id,created_at,model_permaslug,provider_name,api_key_name,app_name,"
+    "tokens_prompt,tokens_completion,tokens_reasoning,tokens_cached,cost_total,"
+    "cost_cache,cost_web_search,cost_file_processing,generation_time_ms,"
+    "finish_reason_normalized,streamed,cancelled,num_search_results,user,"
+    "time_to_first_token_ms"
+)
+
+
+def _import_rows(client, rows, prefix="gen"):
+    lines = [_CSV_HEADER]
+    for i, (ts, model, provider, cost, latency) in enumerate(rows):
+        lines.append(
+            f"{prefix}-{i},{ts},{model},{provider},Primary,App,10,20,0,0,{cost},0,0,0,"
+            f"{latency},stop,true,false,0,u,50"
+        )
+    r = client.post("/api/import/csv",
+        files={"file": ("activity.csv", "\n".join(lines) + "\n", "text/csv")})
+    assert r.status_code == 200
+    return r.json()
+
+
+def _close(a, b, rel=0.011):
+    return abs(a - b) <= rel * abs(b)
+
+
+def test_sketch_quantiles_are_within_relative_accuracy(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    rng = random.Random(7)
+    values = [rng.lognormvariate(6, 1.2) for _ in range(5000)]
+    left, right = module.QuantileSketch(), module.QuantileSketch()
+    for i, v in enumerate(values):
+        (left if i % 2 else right).add(v)
+    left.merge(right)
+    restored = module.QuantileSketch.from_json(left.to_json())
+
+    ordered = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(len(ordered) * q)]
+        assert _close(restored.quantile(q), exact)
+    assert restored.count == len(values)
+
+
+def test_sketch_counts_zeros_and_ignores_missing(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    sketch = module.QuantileSketch()
+    for v in (0, 0, 0, None, 10):
+        sketch.add(v)
+    assert sketch.count == 4
+    assert sketch.quantile(0.5) == 0.0
+    assert _close(sketch.quantile(0.99), 10)
+    assert module.QuantileSketch().quantile(0.5) is None
+
+
+def test_summary_percentiles_come_from_daily_sketches(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    rows = []
+    for day in ("2026-04-10", "2026-04-11", "2026-04-12"):
+        for i in range(40):
+            rows.append((f"{day}T{i % 24:02d}:00:00Z", "openai/gpt-4o-mini", "OpenAI",
+                         0.001 * (i + 1), 100 + i * 10))
+    rows.append(("2026-04-12T05:00:00Z", "anthropic/claude-3.7-sonnet", "Anthropic", 5.0, 9000))
+    _import_rows(client, rows)
+
+    async def _no_scan(*args, **kwargs):
+        raise AssertionError("percentiles should not scan generations")
+    monkeypatch.setattr(module, "_percentile", _no_scan)
+
+    params = {"from": "2026-04-10T00:00:00Z", "to": "2026-04-13T00:00:00Z", "model": "gpt-4o-mini"}
+    body = client.get("/api/summary", params=params).json()
+    latencies = sorted(100 + i * 10 for i in range(40) for _ in range(3))
+    assert body["request_count"] == 120
+    assert _close(body["p50_latency_ms"], latencies[60])
+    assert _close(body["p95_latency_ms"], latencies[114])
+
+    breakdown = client.get("/api/breakdown", params={
+        "from": "2026-04-10T00:00:00Z", "to": "2026-04-13T00:00:00Z", "group_by": "model",
+    }).json()
+    by_dim = {d["dimension"]: d for d in breakdown["data"]}
+    assert _close(by_dim["claude-3.7-sonnet"]["p50_latency_ms"], 9000)
+    assert _close(by_dim["gpt-4o-mini"]["p95_latency_ms"], latencies[114])
+
+
+def test_summary_sketches_cover_partial_days_from_raw_rows(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_rows(client, [
+        ("2026-04-10T06:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.01, 100),
+        ("2026-04-10T18:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.02, 200),
+        ("2026-04-11T12:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.03, 300),
+        ("2026-04-12T03:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.04, 400),
+        ("2026-04-12T20:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.05, 500),
+    ])
+
+    body = client.get("/api/summary", params={
+        "from": "2026-04-10T12:00:00Z", "to": "2026-04-12T12:00:00Z",
+    }).json()
+    assert body["request_count"] == 3
+    assert _close(body["p50_latency_ms"], 300)
+    assert _close(body["p95_cost_per_request"], 0.04)
+
+
+def test_summary_falls_back_to_raw_percentiles_for_unsupported_filters(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_rows(client, [
+        ("2026-04-10T06:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.01, 123),
+        ("2026-04-10T07:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.02, 456),
+    ])
+
+    body = client.get("/api/summary", params={
+        "from": "2026-04-10T00:00:00Z", "to": "2026-04-11T00:00:00Z", "finish_reason": "stop",
+    }).json()
+    assert body["p50_latency_ms"] == 456
+    assert body["p50_cost_per_request"] == 0.02
+
+
+def test_result_cache_serves_repeat_queries_until_data_changes(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _import_rows(client, [("2026-04-10T06:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.01, 100)])
+    params = {"from": "2026-04-10T00:00:00Z", "to": "2026-04-11T00:00:00Z"}
+
+    first = client.get("/api/summary", params=params).json()
+    # Filter order is normalized, so a reordered filter list hits the same entry.
+    client.get("/api/breakdown", params={**params, "model": "b,a"})
+    client.get("/api/breakdown", params={**params, "model": "a,b"})
+    second = client.get("/api/summary", params=params).json()
+    assert second == first
+    stats = client.get("/api/health").json()["result_cache"]
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    generation = stats["generation"]
+
+    _import_rows(client, [("2026-04-10T07:00:00Z", "openai/gpt-4o-mini", "OpenAI", 0.02, 200)],
+                 prefix="later")
+    third = client.get("/api/summary", params=params).json()
+    assert third["request_count"] == 2
+    assert client.get("/api/health").json()["result_cache"]["generation"] > generation
+
+    client.post("/api/purge", params={"before": "2026-04-11"})
+    assert client.get("/api/summary", params=params).json()["request_count"] == 0
+
+
+def test_result_cache_evicts_least_recently_used_within_byte_budget(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    cache = module.ResultCache(max_bytes=200)
+    for key in "abcd":
+        cache.put((key,), key * 40)
+    assert cache.get(("a",)) == "a" * 40
+    cache.put(("e",), "e" * 40)
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None
+    assert cache.stats()["bytes"] <= 200
+    assert cache.stats()["evictions"] == 1
+    cache.put(("huge",), "h" * 60)
+    assert cache.get(("huge",)) is None
+
+
+def _rollup_fixture(client):
+    rows = []
+    for day in range(10, 16):
+        for hour in (0, 5, 11, 17, 23):
+            rows.append((f"2026-04-{day:02d}T{hour:02d}:{day % 7 * 5:02d}:00Z",
+                         "openai/gpt-4o-mini", "OpenAI", 0.001 * hour, 100 + hour))
+            rows.append((f"2026-04-{day:02d}T{hour:02d}:30:00Z",
+                         "anthropic/claude-3.7-sonnet", "Anthropic", 0.01, 900))
+    _import_rows(client, rows)
+
+
+def test_rollup_paths_match_raw_scans(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _rollup_fixture(client)
+    base = {"from": "2026-04-10T11:30:00Z", "to": "2026-04-15T17:15:00Z"}
+    cases = [
+        ("/api/timeseries", {**base, "bucket": "day", "metric": "cost"}, "daily"),
+        ("/api/timeseries", {**base, "bucket": "day", "metric": "latency",
+                             "group_by": "provider"}, "hourly"),
+        ("/api/timeseries", {**base, "bucket": "hour", "metric": "requests",
+                             "tz": "Asia/Tokyo"}, "hourly"),
+        ("/api/breakdown", {**base, "group_by": "model", "metric": "tokens"}, "daily"),
+        ("/api/breakdown", {**base, "group_by": "api_key", "metric": "latency"}, "hourly"),
+        ("/api/breakdown", {**base, "group_by": "origin"}, "raw"),
+        ("/api/heatmap", {**base, "metric": "requests"}, "hourly"),
+        ("/api/heatmap", {**base, "tz": "Asia/Kolkata"}, "raw"),
+    ]
+    served = []
+    for url, params, expected_path in cases:
+        r = client.get(url, params=params)
+        assert r.headers[module.QUERY_PATH_HEADER] == expected_path, (url, params)
+        served.append(r.json())
+
+    monkeypatch.setattr(module, "choose_query_path", lambda *a, **k: "raw")
+    module._result_cache.bump()
+    for (url, params, _), body in zip(cases, served):
+        r = client.get(url, params=params)
+        assert r.headers[module.QUERY_PATH_HEADER] == "raw"
+        assert _same(r.json(), body), (url, params)
+
+
+def _same(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(a - b) <= 1e-9 * max(1.0, abs(b))
+    return a == b
+
+
+def test_rollup_path_header_survives_cache_hits(monkeypatch, tmp_path):
+    module = load_module(monkeypatch, tmp_path / "runtime_home")
+    client, _ = build_client(module, tmp_path)
+    _rollup_fixture(client)
+    params = {"from": "2026-04-10T00:00:00Z", "to": "2026-04-16T00:00:00Z", "bucket": "week"}
+    assert client.get("/api/timeseries", params=params).headers[module.QUERY_PATH_HEADER] == "daily"
+    assert client.get("/api/timeseries", params=params).headers[module.QUERY_PATH_HEADER] == "daily"
+    assert client.get("/api/health").json()["result_cache"]["hits"] == 1
+    short = {"from": "2026-04-10T11:10:00Z", "to": "2026-04-10T11:50:00Z", "bucket": "minute"}
+    assert client.get("/api/timeseries", params=short).headers[module.QUERY_PATH_HEADER] == "raw"